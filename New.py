@@ -1,50 +1,23 @@
-from flask import Flask, render_template, jsonify
-import sqlite3
-from datetime import datetime
+"""The prototype app's KPI catalogue route, /api/kpis/<dept_id>, as a blueprint.
 
-app = Flask(__name__)
-DB = "gpse.db"
+app.create_app() registers it on the hub, which serves the prototype's other
+routes (/dashboard, /kpi-library, /api/departments, /api/kpi/<id>) itself,
+against the same pooled gpse.db connections.
+"""
+from flask import Blueprint, current_app, jsonify
 
-def db():
-    c = sqlite3.connect(DB)
-    c.row_factory = sqlite3.Row
-    return c
+from kpi_sync import PUBLIC_COLUMNS
 
-def now():
-    return datetime.now().strftime("%Y-%m-%d %H:%M")
+bp = Blueprint("kpi_catalog", __name__)
 
-@app.route("/")
-@app.route("/dashboard")
-def dashboard():
-    with db() as c:
-        reports = c.execute("SELECT * FROM reports").fetchall()
-    return render_template("dashboard.html", reports=reports)
 
-@app.route("/kpi-library")
-def kpi_library():
-    return render_template("kpi_library.html")
-
-@app.route("/api/departments")
-def departments():
-    with db() as c:
-        rows = c.execute("SELECT * FROM departments").fetchall()
-    return jsonify([dict(r) for r in rows])
-
-@app.route("/api/kpis/<int:dept_id>")
+@bp.route("/api/kpis/<int:dept_id>")
 def kpis_by_dept(dept_id):
-    with db() as c:
-        rows = c.execute(
-            "SELECT * FROM kpi_master WHERE dept_id=?", (dept_id,)
-        ).fetchall()
+    with current_app.extensions["gpse_read_conn"]() as c:
+        rows = c.execute(f"SELECT {', '.join(PUBLIC_COLUMNS)} FROM kpi_master WHERE dept_id=?", (dept_id,)).fetchall()
     return jsonify([dict(r) for r in rows])
 
-@app.route("/api/kpi/<int:kpi_id>")
-def kpi_detail(kpi_id):
-    with db() as c:
-        row = c.execute(
-            "SELECT * FROM kpi_master WHERE kpi_id=?", (kpi_id,)
-        ).fetchone()
-    return jsonify(dict(row))
-    
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    from app import create_app
+    create_app().run(debug=True)
@@ -1,162 +1,510 @@
 import os
+import io
+import re
+import csv
+import json
+import zlib
 import sqlite3
+import hashlib
+import threading
+import time
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file, flash
+from functools import wraps
+import click
+from flask import (Flask, Response, render_template, request, redirect, url_for, jsonify, send_file, flash,
+                   before_render_template, template_rendered)
 
-try:
-    from pptx import Presentation
-    from pptx.util import Pt
-    PPTX_OK = True
-except Exception:
-    PPTX_OK = False
+from cache import FragmentCache, LRUCache
+from dbpool import ConnectionPool, DEFAULT_PRAGMAS
+from decks import DeckJobs, QueueFull, pptx_available
+from profiling import Profiler
+from ingest import KPI_FIELDS, check_kpis, insert_kpis, parse_rows, rate_values, validate_kpi
+from rag_rules import load_engine, recompute_rag
+import archive
+from kpi_sync import CONTENT_FIELDS, PUBLIC_COLUMNS as KPI_PUBLIC_COLUMNS, content_hash, sync_library
+from changes import ChangeNotifier, changes_since, last_seq, log_change, sse_event
+
+def _fts5_available():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.Error:
+        return False
+
+FTS5_OK = _fts5_available()
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(APP_DIR, "gpse.db")
 PPT_DIR = os.path.join(APP_DIR, "output_ppt")
-os.makedirs(PPT_DIR, exist_ok=True)
+HUB_URL = "http://127.0.0.1:5000/report/"
 
 app = Flask(__name__)
 app.secret_key = "gpse-v2-plus"
+app.config.update(
+    DB_POOL_SIZE=int(os.environ.get("GPSE_DB_POOL_SIZE", 8)),
+    DB_POOL_TIMEOUT=float(os.environ.get("GPSE_DB_POOL_TIMEOUT", 30)),
+    DB_LOCK_RETRIES=int(os.environ.get("GPSE_DB_LOCK_RETRIES", 5)),
+    DB_PRAGMAS=dict(DEFAULT_PRAGMAS),
+    DB_READ_POOL=os.environ.get("GPSE_DB_READ_POOL", "").lower() in ("1", "true", "yes"),
+    DB_READ_POOL_SIZE=int(os.environ.get("GPSE_DB_READ_POOL_SIZE", 8)),
+    DASHBOARD_PAGE_SIZE=int(os.environ.get("GPSE_DASHBOARD_PAGE_SIZE", 100)),
+    RESPONSE_CACHE_SIZE=int(os.environ.get("GPSE_RESPONSE_CACHE_SIZE", 512)),
+    RESPONSE_CACHE_TTL=float(os.environ.get("GPSE_RESPONSE_CACHE_TTL", 30)),
+    RESPONSE_CACHE_MAX_BYTES=int(os.environ.get("GPSE_RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    FRAGMENT_CACHE_SIZE=int(os.environ.get("GPSE_FRAGMENT_CACHE_SIZE", 2048)),
+    FRAGMENT_CACHE_TTL=float(os.environ.get("GPSE_FRAGMENT_CACHE_TTL", os.environ.get("GPSE_RESPONSE_CACHE_TTL", 30))),
+    FRAGMENT_CACHE_MAX_BYTES=int(os.environ.get("GPSE_FRAGMENT_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    PPT_WORKERS=int(os.environ.get("GPSE_PPT_WORKERS", 2)),
+    PPT_MAX_PENDING=int(os.environ.get("GPSE_PPT_MAX_PENDING", 100)),
+    PROFILING=os.environ.get("GPSE_PROFILING", "").lower() in ("1", "true", "yes"),
+    SLOW_QUERY_MS=float(os.environ.get("GPSE_SLOW_QUERY_MS", 100)),
+    ARCHIVE_DB=os.environ.get("GPSE_ARCHIVE_DB", ""),
+    ARCHIVE_AFTER_WEEKS=int(os.environ.get("GPSE_ARCHIVE_AFTER_WEEKS", 26)),
+    CHANGES_POLL_SECONDS=float(os.environ.get("GPSE_CHANGES_POLL_SECONDS", 2)),
+    CHANGES_STREAM_SECONDS=float(os.environ.get("GPSE_CHANGES_STREAM_SECONDS", 300)),
+    CHANGES_MAX_STREAMS=int(os.environ.get("GPSE_CHANGES_MAX_STREAMS", 2)),
+    DASHBOARD_POLL_SECONDS=float(os.environ.get("GPSE_DASHBOARD_POLL_SECONDS", 30)),
+)
+
+profiler = Profiler(slow_ms=app.config["SLOW_QUERY_MS"])
+
+def _profile_statement(sql, seconds):
+    if profiler.statement(sql, seconds):
+        app.logger.warning("slow query (%.0f ms) in %s: %s", seconds * 1000, profiler.current().route, sql.strip()[:300])
+
+def _profile_checkout(seconds):
+    profiler.phase("db_checkout", seconds)
+
+_pool = None
+_read_pool = None
+_pool_lock = threading.Lock()
+
+def _new_pool(path, size, pragmas, uri=False):
+    return ConnectionPool(path, size=size, pragmas=pragmas, uri=uri,
+                          timeout=app.config["DB_POOL_TIMEOUT"],
+                          lock_retries=app.config["DB_LOCK_RETRIES"],
+                          on_statement=[_profile_statement] if app.config["PROFILING"] else (),
+                          on_checkout=[_profile_checkout] if app.config["PROFILING"] else ())
+
+def get_pool():
+    """The read-write pool. With DB_READ_POOL on it holds a single connection, so this
+    process's writes are serialized instead of contending for SQLite's write lock."""
+    global _pool
+    if _pool is None or _pool.path != DB_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.path != DB_PATH:
+                if _pool is not None:
+                    _pool.close()
+                size = 1 if app.config["DB_READ_POOL"] else app.config["DB_POOL_SIZE"]
+                _pool = _new_pool(DB_PATH, size, app.config["DB_PRAGMAS"])
+    return _pool
+
+def get_read_pool():
+    """Read-only connections (mode=ro, query_only) for the read routes; WAL lets them run beside the writer."""
+    global _read_pool
+    uri = archive.read_uri(DB_PATH)
+    if _read_pool is None or _read_pool.path != uri:
+        with _pool_lock:
+            if _read_pool is None or _read_pool.path != uri:
+                if _read_pool is not None:
+                    _read_pool.close()
+                pragmas = {k: v for k, v in app.config["DB_PRAGMAS"].items() if k != "journal_mode"}
+                _read_pool = _new_pool(uri, app.config["DB_READ_POOL_SIZE"], {**pragmas, "query_only": 1}, uri=True)
+    return _read_pool
+
+def close_pool():
+    global _pool, _read_pool
+    with _pool_lock:
+        for pool in (_pool, _read_pool):
+            if pool is not None:
+                pool.close()
+        _pool = _read_pool = None
 
 def conn():
-    c = sqlite3.connect(DB_PATH)
-    c.row_factory = sqlite3.Row
-    return c
+    return get_pool().connection()
+
+def archive_path():
+    """The archive database for old snapshots/versions; defaults to <db>-archive.db next to DB_PATH."""
+    return app.config["ARCHIVE_DB"] or os.path.splitext(DB_PATH)[0] + "-archive.db"
+
+def read_conn():
+    """Connection for routes that only read: the read-only pool when DB_READ_POOL is on, else conn()."""
+    if app.config["DB_READ_POOL"]:
+        return get_read_pool().connection()
+    return conn()
+
+response_cache = LRUCache(maxsize=app.config["RESPONSE_CACHE_SIZE"], ttl=app.config["RESPONSE_CACHE_TTL"],
+                          max_bytes=app.config["RESPONSE_CACHE_MAX_BYTES"])
+
+# Rendered page bodies (report detail, dashboard). Not cleared by data_changed():
+# fragments are re-checked against response_cache.generation instead.
+fragment_cache = FragmentCache(maxsize=app.config["FRAGMENT_CACHE_SIZE"], ttl=app.config["FRAGMENT_CACHE_TTL"],
+                               max_bytes=app.config["FRAGMENT_CACHE_MAX_BYTES"])
+
+change_notifier = ChangeNotifier()
+# Each open /api/changes/stream holds a server thread, so only a few may run per process.
+change_streams = threading.BoundedSemaphore(app.config["CHANGES_MAX_STREAMS"])
+
+def data_changed():
+    """Call after a write commits: drops cached responses and lookups and wakes /api/changes streams."""
+    response_cache.invalidate()
+    change_notifier.notify()
+
+def cached_response(view):
+    """Serve a read-only GET view from response_cache with strong ETag and Last-Modified."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.full_path
+        entry = response_cache.get(key)
+        if entry is None:
+            generation = response_cache.generation
+            resp = app.make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or resp.is_streamed:
+                return resp
+            body = resp.get_data()
+            entry = (body, resp.mimetype, hashlib.sha1(body).hexdigest())
+            response_cache.set(key, entry, size=len(body), generation=generation)
+        body, mimetype, etag = entry
+        resp = Response(body, mimetype=mimetype)
+        resp.set_etag(etag)
+        resp.last_modified = response_cache.last_modified
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
+    return wrapper
 
 def now():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+def _migrate_v1(c):
+    c.execute("""CREATE TABLE IF NOT EXISTS reports (
+        report_id TEXT PRIMARY KEY,
+        project TEXT NOT NULL,
+        week TEXT NOT NULL,
+        owner TEXT NOT NULL,
+        report_type TEXT NOT NULL,
+        status TEXT NOT NULL,
+        storage_url TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS versions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        report_id TEXT NOT NULL,
+        version_no INTEGER NOT NULL,
+        notes TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(report_id) REFERENCES reports(report_id)
+    )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS kpis (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        report_id TEXT NOT NULL,
+        sla REAL,
+        p1_incidents INTEGER,
+        mttr_minutes INTEGER,
+        risk_count INTEGER,
+        rag TEXT,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(report_id) REFERENCES reports(report_id)
+    )""")
+
+    c.execute("""CREATE TABLE IF NOT EXISTS departments (
+        dept_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        dept_name TEXT UNIQUE NOT NULL
+    )""")
+
+    c.execute("""CREATE TABLE IF NOT EXISTS kpi_master (
+        kpi_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        dept_id INTEGER NOT NULL,
+        section TEXT NOT NULL,
+        kpi_key TEXT NOT NULL,
+        kpi_name TEXT NOT NULL,
+        formula_display TEXT NOT NULL,
+        description TEXT,
+        calculation_notes TEXT,
+        green_rule TEXT,
+        amber_rule TEXT,
+        red_rule TEXT,
+        owner_team TEXT,
+        updated_at TEXT NOT NULL,
+        UNIQUE(dept_id, kpi_key),
+        FOREIGN KEY(dept_id) REFERENCES departments(dept_id)
+    )""")
+
+def _migrate_v2(c):
+    # Latest snapshot per report = greatest (created_at, id), kept current by a
+    # trigger so every insert path (forms, seeds, bulk loads) maintains it in
+    # the inserting transaction.
+    c.execute("""CREATE TABLE IF NOT EXISTS kpi_latest (
+        report_id TEXT PRIMARY KEY,
+        kpi_id INTEGER NOT NULL,
+        created_at TEXT NOT NULL
+    )""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS kpis_latest_ai AFTER INSERT ON kpis
+        WHEN NOT EXISTS (SELECT 1 FROM kpi_latest l WHERE l.report_id = new.report_id
+                         AND (l.created_at > new.created_at OR (l.created_at = new.created_at AND l.kpi_id > new.id)))
+        BEGIN
+            INSERT OR REPLACE INTO kpi_latest(report_id, kpi_id, created_at) VALUES (new.report_id, new.id, new.created_at);
+        END""")
+    # One sort over kpis: idx_kpis_report_created only arrives in v3.
+    c.execute("""INSERT OR REPLACE INTO kpi_latest(report_id, kpi_id, created_at)
+        SELECT report_id, id, created_at FROM (
+            SELECT report_id, id, created_at, ROW_NUMBER() OVER (
+                PARTITION BY report_id ORDER BY created_at DESC, id DESC) AS rn
+            FROM kpis)
+        WHERE rn = 1""")
+
+INDEXES = {
+    "idx_kpis_report_created": "kpis(report_id, created_at)",
+    "idx_versions_report_vno": "versions(report_id, version_no)",
+    "idx_reports_updated": "reports(updated_at, report_id)",
+    "idx_reports_project": "reports(project, updated_at)",
+    "idx_reports_week": "reports(week, updated_at)",
+    "idx_reports_owner": "reports(owner, updated_at)",
+    "idx_reports_type": "reports(report_type, updated_at)",
+    "idx_kpi_master_section": "kpi_master(section, kpi_name)",
+    "idx_kpi_master_key": "kpi_master(kpi_key)",
+}
+
+def _migrate_v3(c):
+    for name, target in INDEXES.items():
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+def _migrate_v4(c):
+    # Full-text indexes for dashboard / KPI library search. Both are external
+    # content tables kept in sync by triggers. reports has no INTEGER PRIMARY
+    # KEY, so its rowids can change on VACUUM: rebuild reports_fts afterwards.
+    if not FTS5_OK:
+        return
+    c.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+        report_id, project, owner, report_type,
+        content='reports', prefix='2 3')""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS reports_fts_ai AFTER INSERT ON reports BEGIN
+        INSERT INTO reports_fts(rowid, report_id, project, owner, report_type)
+        VALUES (new.rowid, new.report_id, new.project, new.owner, new.report_type);
+    END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS reports_fts_ad AFTER DELETE ON reports BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, report_id, project, owner, report_type)
+        VALUES ('delete', old.rowid, old.report_id, old.project, old.owner, old.report_type);
+    END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS reports_fts_au AFTER UPDATE OF report_id, project, owner, report_type ON reports BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, report_id, project, owner, report_type)
+        VALUES ('delete', old.rowid, old.report_id, old.project, old.owner, old.report_type);
+        INSERT INTO reports_fts(rowid, report_id, project, owner, report_type)
+        VALUES (new.rowid, new.report_id, new.project, new.owner, new.report_type);
+    END""")
+    c.execute("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')")
+
+    c.execute("""CREATE VIEW IF NOT EXISTS kpi_master_search AS
+        SELECT km.kpi_id, km.kpi_name, km.kpi_key, km.section, d.dept_name,
+               km.formula_display, km.description, km.calculation_notes
+        FROM kpi_master km JOIN departments d ON d.dept_id = km.dept_id""")
+    c.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS kpi_master_fts USING fts5(
+        kpi_name, kpi_key, section, dept_name, formula_display, description, calculation_notes,
+        content='kpi_master_search', content_rowid='kpi_id', prefix='2 3')""")
+    cols = "kpi_name, kpi_key, section, dept_name, formula_display, description, calculation_notes"
+    new_vals = ("new.kpi_name, new.kpi_key, new.section, "
+                "(SELECT dept_name FROM departments WHERE dept_id = new.dept_id), "
+                "new.formula_display, new.description, new.calculation_notes")
+    old_vals = new_vals.replace("new.", "old.")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS kpi_master_fts_ai AFTER INSERT ON kpi_master BEGIN
+        INSERT INTO kpi_master_fts(rowid, {cols}) VALUES (new.kpi_id, {new_vals});
+    END""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS kpi_master_fts_ad AFTER DELETE ON kpi_master BEGIN
+        INSERT INTO kpi_master_fts(kpi_master_fts, rowid, {cols}) VALUES ('delete', old.kpi_id, {old_vals});
+    END""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS kpi_master_fts_au AFTER UPDATE ON kpi_master BEGIN
+        INSERT INTO kpi_master_fts(kpi_master_fts, rowid, {cols}) VALUES ('delete', old.kpi_id, {old_vals});
+        INSERT INTO kpi_master_fts(rowid, {cols}) VALUES (new.kpi_id, {new_vals});
+    END""")
+    c.execute("INSERT INTO kpi_master_fts(kpi_master_fts) VALUES ('rebuild')")
+
+# Per (project, week, report_type) totals of every KPI snapshot, plus an MTTR
+# histogram for percentiles. Exact below 60 min, then 5/30/240-minute buckets.
+ROLLUP_KEYS = ("project", "week", "report_type")
+MTTR_BUCKET = ("CASE WHEN {m} < 60 THEN {m} WHEN {m} < 240 THEN {m} - {m} % 5 "
+               "WHEN {m} < 1440 THEN {m} - {m} % 30 ELSE {m} - {m} % 240 END")
+_ROLLUP_COLS = ("snapshots", "sla_sum", "sla_n", "p1_sum", "mttr_sum", "mttr_n", "risk_sum", "green", "amber", "red")
+_ROLLUP_AGGS = ("COUNT(*)", "TOTAL({k}sla)", "COUNT({k}sla)", "COALESCE(SUM({k}p1_incidents), 0)",
+                "COALESCE(SUM({k}mttr_minutes), 0)", "COUNT({k}mttr_minutes)", "COALESCE(SUM({k}risk_count), 0)",
+                "COALESCE(SUM({k}rag = 'Green'), 0)", "COALESCE(SUM({k}rag = 'Amber'), 0)", "COALESCE(SUM({k}rag = 'Red'), 0)")
+
+def _rollup_sql(keys, source, sign="", k="k."):
+    """Upserts adding (sign="") or removing (sign="-") the kpis rows in source (columns prefixed k) under keys."""
+    upd = ", ".join(f"{col} = {col} + excluded.{col}" for col in _ROLLUP_COLS)
+    aggs = ", ".join(sign + a.format(k=k) for a in _ROLLUP_AGGS)
+    bucket = MTTR_BUCKET.format(m=f"{k}mttr_minutes")
+    return [
+        f"""INSERT INTO kpi_rollup({", ".join(ROLLUP_KEYS + _ROLLUP_COLS)})
+            SELECT {keys}, {aggs} FROM {source} GROUP BY 1, 2, 3
+            ON CONFLICT({", ".join(ROLLUP_KEYS)}) DO UPDATE SET {upd}""",
+        f"""INSERT INTO kpi_mttr_hist({", ".join(ROLLUP_KEYS)}, bucket, n)
+            SELECT {keys}, {bucket}, {sign}COUNT(*) FROM {source} AND {k}mttr_minutes IS NOT NULL GROUP BY 1, 2, 3, 4
+            ON CONFLICT({", ".join(ROLLUP_KEYS)}, bucket) DO UPDATE SET n = n + excluded.n""",
+    ]
+
+def _migrate_v5(c):
+    # Maintained by triggers in the inserting transaction, like kpi_latest.
+    # Deleting a snapshot (archive_old) leaves its totals in place. A report moving
+    # to another project/week/type moves the totals of its hot snapshots only:
+    # triggers cannot see the archive database (see archive.py).
+    c.execute(f"""CREATE TABLE IF NOT EXISTS kpi_rollup (
+        project TEXT NOT NULL, week TEXT NOT NULL, report_type TEXT NOT NULL,
+        {", ".join(f"{col} {'REAL' if col == 'sla_sum' else 'INTEGER'} NOT NULL DEFAULT 0" for col in _ROLLUP_COLS)},
+        PRIMARY KEY(project, week, report_type)
+    ) WITHOUT ROWID""")
+    c.execute("""CREATE TABLE IF NOT EXISTS kpi_mttr_hist (
+        project TEXT NOT NULL, week TEXT NOT NULL, report_type TEXT NOT NULL,
+        bucket INTEGER NOT NULL, n INTEGER NOT NULL,
+        PRIMARY KEY(project, week, report_type, bucket)
+    ) WITHOUT ROWID""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS kpis_rollup_ai AFTER INSERT ON kpis BEGIN
+        {"; ".join(_rollup_sql("r.project, r.week, r.report_type", "reports r WHERE r.report_id = new.report_id", k="new."))};
+    END""")
+    moved = "kpis k WHERE k.report_id = new.report_id"
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS reports_rollup_au AFTER UPDATE OF project, week, report_type ON reports
+        WHEN old.project IS NOT new.project OR old.week IS NOT new.week OR old.report_type IS NOT new.report_type
+        BEGIN
+        {"; ".join(_rollup_sql("old.project, old.week, old.report_type", moved, sign="-")
+                   + _rollup_sql("new.project, new.week, new.report_type", moved))};
+    END""")
+    for sql in _rollup_sql("r.project, r.week, r.report_type", "kpis k JOIN reports r ON r.report_id = k.report_id WHERE 1"):
+        c.execute(sql)
+
+def _migrate_v6(c):
+    # RAG rules are looked up by kpi_key (new INDEXES entries), and re-rating
+    # snapshots in place keeps the rollup RAG counts in step.
+    _migrate_v3(c)
+    c.execute("""CREATE TRIGGER IF NOT EXISTS kpis_rollup_rag_au AFTER UPDATE OF rag ON kpis
+        WHEN old.rag IS NOT new.rag BEGIN
+        UPDATE kpi_rollup SET
+            green = green + (new.rag IS 'Green') - (old.rag IS 'Green'),
+            amber = amber + (new.rag IS 'Amber') - (old.rag IS 'Amber'),
+            red = red + (new.rag IS 'Red') - (old.rag IS 'Red')
+        WHERE (project, week, report_type) = (SELECT project, week, report_type FROM reports WHERE report_id = new.report_id);
+    END""")
+
+FACETS = ("project", "week", "owner", "report_type")
+
+def _migrate_v7(c):
+    # One row per distinct (project, week, owner, report_type) with its report
+    # count, so the dashboard dropdowns are counted from this cube instead of
+    # scanning reports.
+    cols = ", ".join(FACETS)
+    c.execute(f"""CREATE TABLE IF NOT EXISTS report_facets (
+        project TEXT NOT NULL, week TEXT NOT NULL, owner TEXT NOT NULL, report_type TEXT NOT NULL,
+        n INTEGER NOT NULL, PRIMARY KEY({cols})
+    ) WITHOUT ROWID""")
+    add = (f"INSERT INTO report_facets({cols}, n) VALUES (new.project, new.week, new.owner, new.report_type, 1) "
+           f"ON CONFLICT({cols}) DO UPDATE SET n = n + 1")
+    remove = (f"UPDATE report_facets SET n = n - 1 WHERE ({cols}) = (old.project, old.week, old.owner, old.report_type); "
+              "DELETE FROM report_facets WHERE n <= 0")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS reports_facets_ai AFTER INSERT ON reports BEGIN {add}; END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS reports_facets_ad AFTER DELETE ON reports BEGIN {remove}; END")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS reports_facets_au AFTER UPDATE OF {cols} ON reports
+        WHEN old.project IS NOT new.project OR old.week IS NOT new.week
+          OR old.owner IS NOT new.owner OR old.report_type IS NOT new.report_type
+        BEGIN {remove}; {add}; END""")
+    c.execute(f"INSERT OR REPLACE INTO report_facets({cols}, n) SELECT {cols}, COUNT(*) FROM reports GROUP BY {cols}")
+
+def _migrate_v8(c):
+    # Append-only feed of writes for /api/changes, written by the routes in
+    # the same transaction (see changes.py).
+    c.execute("""CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        report_id TEXT,
+        payload TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )""")
+
+def _migrate_v9(c):
+    # KPI library sync compares definitions by this hash instead of field by field.
+    if "content_hash" not in {r["name"] for r in c.execute("PRAGMA table_info(kpi_master)")}:
+        c.execute("ALTER TABLE kpi_master ADD COLUMN content_hash TEXT")
+    rows = c.execute(f"SELECT kpi_id, {', '.join(CONTENT_FIELDS)} FROM kpi_master WHERE content_hash IS NULL").fetchall()
+    c.executemany("UPDATE kpi_master SET content_hash=? WHERE kpi_id=?",
+                  [(content_hash(tuple(r)[1:]), r["kpi_id"]) for r in rows])
+
+# Schema changes are append-only: add a new _migrate_vN step and list it here.
+# The applied version is stored in PRAGMA user_version, so a database is only
+# migrated once and the request path never runs DDL.
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5, _migrate_v6, _migrate_v7, _migrate_v8, _migrate_v9]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate(c):
+    version = c.execute("PRAGMA user_version").fetchone()[0]
+    for v in range(version, SCHEMA_VERSION):
+        MIGRATIONS[v](c)
+        c.execute(f"PRAGMA user_version={v + 1}")
+    return version
+
+_db_lock = threading.Lock()
+_db_ready = None  # DB_PATH that has been migrated/seeded by this process
+
 def init_db():
-    with conn() as c:
-        c.execute("""CREATE TABLE IF NOT EXISTS reports (
-            report_id TEXT PRIMARY KEY,
-            project TEXT NOT NULL,
-            week TEXT NOT NULL,
-            owner TEXT NOT NULL,
-            report_type TEXT NOT NULL,
-            status TEXT NOT NULL,
-            storage_url TEXT,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL
-        )""")
-        c.execute("""CREATE TABLE IF NOT EXISTS versions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            report_id TEXT NOT NULL,
-            version_no INTEGER NOT NULL,
-            notes TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY(report_id) REFERENCES reports(report_id)
-        )""")
-        c.execute("""CREATE TABLE IF NOT EXISTS kpis (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            report_id TEXT NOT NULL,
-            sla REAL,
-            p1_incidents INTEGER,
-            mttr_minutes INTEGER,
-            risk_count INTEGER,
-            rag TEXT,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY(report_id) REFERENCES reports(report_id)
-        )""")
-
-        c.execute("""CREATE TABLE IF NOT EXISTS departments (
-            dept_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            dept_name TEXT UNIQUE NOT NULL
-        )""")
-
-        c.execute("""CREATE TABLE IF NOT EXISTS kpi_master (
-            kpi_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            dept_id INTEGER NOT NULL,
-            section TEXT NOT NULL,
-            kpi_key TEXT NOT NULL,
-            kpi_name TEXT NOT NULL,
-            formula_display TEXT NOT NULL,
-            description TEXT,
-            calculation_notes TEXT,
-            green_rule TEXT,
-            amber_rule TEXT,
-            red_rule TEXT,
-            owner_team TEXT,
-            updated_at TEXT NOT NULL,
-            UNIQUE(dept_id, kpi_key),
-            FOREIGN KEY(dept_id) REFERENCES departments(dept_id)
-        )""")
-
-        if c.execute("SELECT COUNT(*) AS n FROM departments").fetchone()["n"] == 0:
-            seed_departments(c)
-        if c.execute("SELECT COUNT(*) AS n FROM kpi_master").fetchone()["n"] == 0:
-            seed_kpi_library(c)
-        if c.execute("SELECT COUNT(*) AS n FROM reports").fetchone()["n"] == 0:
-            seed_reports_demo(c)
+    global _db_ready
+    with _db_lock, profiler.span("init_db"):
+        with conn() as c:
+            migrate(c)
+            if c.execute("SELECT COUNT(*) AS n FROM departments").fetchone()["n"] == 0:
+                seed_departments(c)
+            if c.execute("SELECT COUNT(*) AS n FROM kpi_master").fetchone()["n"] == 0:
+                seed_kpi_library(c)
+            if c.execute("SELECT COUNT(*) AS n FROM reports").fetchone()["n"] == 0:
+                seed_reports_demo(c)
+        _db_ready = DB_PATH
+
+def ensure_db():
+    if _db_ready != DB_PATH:
+        init_db()
 
 def seed_departments(c):
     for d in ["NFPE", "INC (Incident)", "CRI", "Service Desk", "GPSE Ops"]:
         c.execute("INSERT INTO departments(dept_name) VALUES(?)", (d,))
 
-def _dept_id(c, dept_name: str) -> int:
-    return c.execute("SELECT dept_id FROM departments WHERE dept_name=?", (dept_name,)).fetchone()["dept_id"]
-
 def seed_kpi_library(c):
-    def upsert(dept_name, section, kpi_key, kpi_name, formula, desc="", notes="", g="", a="", r="", owner="GPSE"):
-        did = _dept_id(c, dept_name)
-        c.execute("""
-        INSERT INTO kpi_master(dept_id, section, kpi_key, kpi_name, formula_display, description, calculation_notes,
-                               green_rule, amber_rule, red_rule, owner_team, updated_at)
-        VALUES(?,?,?,?,?,?,?,?,?,?,?,?)
-        ON CONFLICT(dept_id, kpi_key) DO UPDATE SET
-          section=excluded.section,
-          kpi_name=excluded.kpi_name,
-          formula_display=excluded.formula_display,
-          description=excluded.description,
-          calculation_notes=excluded.calculation_notes,
-          green_rule=excluded.green_rule,
-          amber_rule=excluded.amber_rule,
-          red_rule=excluded.red_rule,
-          owner_team=excluded.owner_team,
-          updated_at=excluded.updated_at
-        """, (did, section, kpi_key, kpi_name, formula, desc, notes, g, a, r, owner, now()))
-
-    upsert("NFPE", "NFPE", "NFPE_CRI_SEV2_RATE", "CRI SEV2 Rate",
-           "CRI SEV2 Rate = (Count of CRI tickets tagged SEV2) / (Total CRI tickets) × 100",
-           desc="Measures concentration of SEV2 within CRI tickets.",
-           notes="Filter: selected reporting period; CRI scope defined by NFPE taxonomy.",
-           g="Green: < 2%", a="Amber: 2%–5%", r="Red: > 5%")
-
-    upsert("NFPE", "NFPE", "NFPE_EXCEPTION_RATE", "Exception Rate",
-           "Exception Rate = (Exception count) / (Total cases processed) × 100",
-           desc="Shows operational exceptions relative to volume.",
-           notes="Define exceptions per NFPE policy; exclude training/test cases.",
-           g="Green: < 0.5%", a="Amber: 0.5%–1.0%", r="Red: > 1.0%")
-
-    upsert("INC (Incident)", "Incident Mgmt", "INC_P1_COUNT", "P1 Incidents",
-           "P1 = count(priority='P1') in reporting period",
-           desc="Number of Priority-1 incidents created in the period.",
-           notes="Use incident creation timestamp; exclude duplicates/cancelled.",
-           g="Green: 0", a="Amber: 1–2", r="Red: ≥ 3")
-
-    upsert("INC (Incident)", "Incident Mgmt", "INC_MTTR_P1", "P1 MTTR (minutes)",
-           "MTTR(P1) = Avg(Resolved Time − Opened Time) for Priority=P1",
-           desc="Mean time to resolve P1 incidents.",
-           notes="Use resolved incidents only; exclude vendor-hold or paused time if policy requires.",
-           g="Green: ≤ 45", a="Amber: 46–90", r="Red: > 90")
-
-    upsert("CRI", "CRI", "CRI_BACKLOG", "CRI Backlog",
-           "Backlog = count(CRI items where status in {Open, In Progress})",
-           desc="Open backlog items under CRI scope.",
-           notes="Backlog definition agreed with CRI ops; snapshot at end of period.",
-           g="Green: ≤ 10", a="Amber: 11–25", r="Red: > 25")
-
-    upsert("Service Desk", "Service Desk", "SD_SLA", "SLA Compliance",
-           "SLA% = (Success / Total) × 100",
-           desc="Share of service desk requests meeting SLA.",
-           notes="Define success as met SLA within policy; period based on ticket closed date.",
-           g="Green: ≥ 99.0%", a="Amber: 97.0%–98.99%", r="Red: < 97.0%")
-
-    upsert("GPSE Ops", "Ops", "OPS_ACTIVE_RISKS", "Active Risks",
-           "Active Risks = count(risks where status='Active')",
-           desc="Count of open/active risks tracked by GPSE Ops.",
-           notes="Risk register maintained weekly; treat overdue mitigations as active.",
-           g="Green: ≤ 2", a="Amber: 3–5", r="Red: > 5")
+    def kpi(dept_name, section, kpi_key, kpi_name, formula, desc="", notes="", g="", a="", r="", owner="GPSE"):
+        return dict(dept_name=dept_name, section=section, kpi_key=kpi_key, kpi_name=kpi_name, formula_display=formula,
+                 description=desc, calculation_notes=notes, green_rule=g, amber_rule=a, red_rule=r, owner_team=owner)
+
+    rows = [
+        kpi("NFPE", "NFPE", "NFPE_CRI_SEV2_RATE", "CRI SEV2 Rate",
+            "CRI SEV2 Rate = (Count of CRI tickets tagged SEV2) / (Total CRI tickets) × 100",
+            desc="Measures concentration of SEV2 within CRI tickets.",
+            notes="Filter: selected reporting period; CRI scope defined by NFPE taxonomy.",
+            g="Green: < 2%", a="Amber: 2%–5%", r="Red: > 5%"),
+        kpi("NFPE", "NFPE", "NFPE_EXCEPTION_RATE", "Exception Rate",
+            "Exception Rate = (Exception count) / (Total cases processed) × 100",
+            desc="Shows operational exceptions relative to volume.",
+            notes="Define exceptions per NFPE policy; exclude training/test cases.",
+            g="Green: < 0.5%", a="Amber: 0.5%–1.0%", r="Red: > 1.0%"),
+        kpi("INC (Incident)", "Incident Mgmt", "INC_P1_COUNT", "P1 Incidents",
+            "P1 = count(priority='P1') in reporting period",
+            desc="Number of Priority-1 incidents created in the period.",
+            notes="Use incident creation timestamp; exclude duplicates/cancelled.",
+            g="Green: 0", a="Amber: 1–2", r="Red: ≥ 3"),
+        kpi("INC (Incident)", "Incident Mgmt", "INC_MTTR_P1", "P1 MTTR (minutes)",
+            "MTTR(P1) = Avg(Resolved Time − Opened Time) for Priority=P1",
+            desc="Mean time to resolve P1 incidents.",
+            notes="Use resolved incidents only; exclude vendor-hold or paused time if policy requires.",
+            g="Green: ≤ 45", a="Amber: 46–90", r="Red: > 90"),
+        kpi("CRI", "CRI", "CRI_BACKLOG", "CRI Backlog",
+            "Backlog = count(CRI items where status in {Open, In Progress})",
+            desc="Open backlog items under CRI scope.",
+            notes="Backlog definition agreed with CRI ops; snapshot at end of period.",
+            g="Green: ≤ 10", a="Amber: 11–25", r="Red: > 25"),
+        kpi("Service Desk", "Service Desk", "SD_SLA", "SLA Compliance",
+            "SLA% = (Success / Total) × 100",
+            desc="Share of service desk requests meeting SLA.",
+            notes="Define success as met SLA within policy; period based on ticket closed date.",
+            g="Green: ≥ 99.0%", a="Amber: 97.0%–98.99%", r="Red: < 97.0%"),
+        kpi("GPSE Ops", "Ops", "OPS_ACTIVE_RISKS", "Active Risks",
+            "Active Risks = count(risks where status='Active')",
+            desc="Count of open/active risks tracked by GPSE Ops.",
+            notes="Risk register maintained weekly; treat overdue mitigations as active.",
+            g="Green: ≤ 2", a="Amber: 3–5", r="Red: > 5"),
+    ]
+    sync_library(c, ((i, row, None) for i, row in enumerate(rows, 1)), now())
 
 def seed_reports_demo(c):
     demo_reports = [
@@ -190,56 +538,174 @@ def seed_reports_demo(c):
         c.execute("""INSERT INTO kpis(report_id, sla, p1_incidents, mttr_minutes, risk_count, rag, created_at)
                      VALUES(?,?,?,?,?,?,?)""", (report_id, sla, p1, mttr, risks, rag, now()))
 
+def latest_kpi(c, report_id):
+    return c.execute("""SELECT k.* FROM kpi_latest l JOIN kpis k ON k.id = l.kpi_id
+                        WHERE l.report_id=?""", (report_id,)).fetchone()
+
+def fts_query(text, any_term=False):
+    """Turn free text into an FTS5 prefix query; all words must match unless any_term."""
+    return (" OR " if any_term else " ").join(f'"{t}"*' for t in re.findall(r"\w+", text.lower()))
+
+# bm25 column weights for kpi_master_fts: name and key matter most.
+KPI_FTS_RANK = "bm25(kpi_master_fts, 10.0, 8.0, 4.0, 3.0, 2.0, 1.0, 1.0)"
+
+KPI_LIBRARY_SQL = """
+    SELECT d.dept_name, km.section, km.kpi_key, km.kpi_name, km.formula_display,
+           km.description, km.calculation_notes, km.green_rule, km.amber_rule, km.red_rule,
+           km.owner_team, km.updated_at
+    FROM kpi_master km
+    JOIN departments d ON d.dept_id = km.dept_id
+    ORDER BY d.dept_name, km.section, km.kpi_name"""
+
+FACET_ORDER = {"project": "value", "week": "value DESC", "owner": "value", "report_type": "value"}
+
+def facet_counts(c, f):
+    """{facet: [(value, reports)]} for the dropdowns plus "total", from report_facets in one query.
+
+    Each facet is counted under the other active dropdown filters (not its own,
+    so the alternatives stay visible); "total" applies all of them. The search
+    box is not reflected.
+    """
+    parts, params = [], []
+    for key in FACETS + ("total",):
+        where = [f"{k}=?" for k in FACETS if f[k] and k != key]
+        params += [f[k] for k in FACETS if f[k] and k != key]
+        value = "''" if key == "total" else key
+        parts.append(f"""SELECT * FROM (SELECT '{key}' AS facet, {value} AS value, SUM(n) AS n FROM report_facets
+                         WHERE {" AND ".join(where) or "1"} GROUP BY 2
+                         ORDER BY {FACET_ORDER.get(key, "value")})""")
+    out = {key: [] for key in FACETS}
+    out["total"] = 0
+    for r in c.execute(" UNION ALL ".join(parts), params):
+        if r["facet"] == "total":
+            out["total"] = r["n"]
+        else:
+            out[r["facet"]].append((r["value"], r["n"]))
+    for key in FACETS:  # keep a selected value in its dropdown even when nothing matches
+        if f[key] and f[key] not in {v for v, _ in out[key]}:
+            out[key].insert(0, (f[key], 0))
+    return out
+
 def summary_cards(c):
     return c.execute("""SELECT
-          AVG(sla) AS avg_sla,
-          SUM(p1_incidents) AS total_p1,
-          AVG(mttr_minutes) AS avg_mttr,
-          SUM(risk_count) AS total_risks
-        FROM kpis""").fetchone()
+          SUM(sla_sum) / SUM(sla_n) AS avg_sla,
+          SUM(p1_sum) AS total_p1,
+          1.0 * SUM(mttr_sum) / SUM(mttr_n) AS avg_mttr,
+          SUM(risk_sum) AS total_risks
+        FROM kpi_rollup""").fetchone()
+
+@app.before_request
+def _profile_begin():
+    if app.config["PROFILING"]:
+        profiler.begin(request.url_rule.rule if request.url_rule else "<unmatched>")
+
+@app.after_request
+def _profile_end(resp):
+    timer, total = profiler.end(request.method, resp.status_code)
+    if timer is not None:
+        resp.headers["Server-Timing"] = timer.server_timing(total)
+    return resp
+
+@app.teardown_request
+def _profile_teardown(exc):
+    profiler.end(request.method, 500)  # no-op unless the request failed before after_request
+
+def _template_start(sender, template, context, **extra):
+    profiler.start("template")
+
+def _template_done(sender, template, context, **extra):
+    profiler.stop("template")
+
+before_render_template.connect(_template_start, app)
+template_rendered.connect(_template_done, app)
+
+@app.before_request
+def _bootstrap_db():
+    ensure_db()
 
 @app.route("/")
 def root():
     return redirect(url_for("dashboard"))
 
+DASHBOARD_FILTERS = ("q", "project", "week", "owner", "report_type")
+DASHBOARD_COUNT_CAP = 1000
+
+def dashboard_filters(args):
+    return {k: args.get(k, "").strip() for k in DASHBOARD_FILTERS}
+
+def dashboard_where(f):
+    """FROM ... WHERE clause and params for the dashboard filters."""
+    q = f["q"].lower()
+    sql, params = " FROM reports r", []
+    match = fts_query(q) if FTS5_OK else ""
+    if match:
+        sql += " JOIN reports_fts ON reports_fts.rowid = r.rowid AND reports_fts MATCH ?"
+        params.append(match)
+    sql += " WHERE 1=1"
+    if q and not match:
+        sql += " AND (lower(r.report_id) LIKE ? OR lower(r.project) LIKE ? OR lower(r.owner) LIKE ? OR lower(r.report_type) LIKE ?)"
+        params += [f"%{q}%", f"%{q}%", f"%{q}%", f"%{q}%"]
+    for key in ("project", "week", "owner", "report_type"):
+        if f[key]:
+            sql += f" AND r.{key}=?"; params.append(f[key])
+    return sql, params
+
+def dashboard_page(c, f, after=""):
+    """One page of matching reports, newest first by (updated_at, report_id), and the next page's cursor."""
+    limit = app.config["DASHBOARD_PAGE_SIZE"]
+    sql, params = dashboard_where(f)
+    if after:
+        updated, _, report_id = after.partition("|")
+        sql += " AND (r.updated_at, r.report_id) < (?, ?)"; params += [updated, report_id]
+    rows = c.execute(f"SELECT r.*{sql} ORDER BY r.updated_at DESC, r.report_id DESC LIMIT ?",
+                     params + [limit + 1]).fetchall()
+    last = rows[limit - 1] if len(rows) > limit else None
+    return rows[:limit], f"{last['updated_at']}|{last['report_id']}" if last else None
+
+def dashboard_count(c, f, facets):
+    """Matching reports: from the facet cube without a search, otherwise counted
+    up to DASHBOARD_COUNT_CAP without touching more rows than that (None above it)."""
+    if not f["q"]:
+        return facets["total"]
+    sql, params = dashboard_where(f)
+    n = c.execute(f"SELECT COUNT(*) FROM (SELECT 1{sql} LIMIT {DASHBOARD_COUNT_CAP + 1})", params).fetchone()[0]
+    return n if n <= DASHBOARD_COUNT_CAP else None
+
 @app.route("/dashboard")
 def dashboard():
-    init_db()
-    q = request.args.get("q", "").strip().lower()
-    project = request.args.get("project", "").strip()
-    week = request.args.get("week", "").strip()
-    owner = request.args.get("owner", "").strip()
-    report_type = request.args.get("report_type", "").strip()
+    f = dashboard_filters(request.args)
+    after = request.args.get("after", "")
+    key = ("dashboard", after) + tuple(f[k] for k in DASHBOARD_FILTERS)
+    body = fragment_cache.fragment(key, response_cache.generation, None, lambda _: render_dashboard(f, after))
+    return render_template("dashboard.html", active="dashboard", fragment=body)
 
-    sql = "SELECT * FROM reports WHERE 1=1"
-    params = []
-    if q:
-        sql += " AND (lower(report_id) LIKE ? OR lower(project) LIKE ? OR lower(owner) LIKE ? OR lower(report_type) LIKE ?)"
-        params += [f"%{q}%", f"%{q}%", f"%{q}%", f"%{q}%"]
-    if project:
-        sql += " AND project=?"; params.append(project)
-    if week:
-        sql += " AND week=?"; params.append(week)
-    if owner:
-        sql += " AND owner=?"; params.append(owner)
-    if report_type:
-        sql += " AND report_type=?"; params.append(report_type)
-    sql += " ORDER BY updated_at DESC"
+def render_dashboard(f, after):
+    with read_conn() as c:
+        reports, next_after = dashboard_page(c, f, after)
+        facets = response_cache.memoize(("dashboard:facets",) + tuple(f[k] for k in FACETS), lambda: facet_counts(c, f))
+        count = dashboard_count(c, f, facets) if not after else None
+        cards = response_cache.memoize("dashboard:cards", lambda: dict(summary_cards(c)))
+        changes_seq = last_seq(c)
 
-    with conn() as c:
-        reports = c.execute(sql, params).fetchall()
-        projects = [r["project"] for r in c.execute("SELECT DISTINCT project FROM reports ORDER BY project").fetchall()]
-        weeks = [r["week"] for r in c.execute("SELECT DISTINCT week FROM reports ORDER BY week DESC").fetchall()]
-        owners = [r["owner"] for r in c.execute("SELECT DISTINCT owner FROM reports ORDER BY owner").fetchall()]
-        types = [r["report_type"] for r in c.execute("SELECT DISTINCT report_type FROM reports ORDER BY report_type").fetchall()]
-        cards = summary_cards(c)
+    return render_template("dashboard_body.html", f=f, after=after,
+                           reports=reports, facets=facets, cards=cards,
+                           next_after=next_after, changes_seq=changes_seq, count=count, count_cap=DASHBOARD_COUNT_CAP,
+                           poll_ms=int(app.config["DASHBOARD_POLL_SECONDS"] * 1000),
+                           page_args={k: v for k, v in f.items() if v})
 
-    return render_template("dashboard.html", active="dashboard",
-                           reports=reports, projects=projects, weeks=weeks, owners=owners, types=types, cards=cards)
+@app.route("/dashboard/rows")
+def dashboard_rows():
+    """Next page of the dashboard table as rendered <tr> rows, for infinite scrolling."""
+    f = dashboard_filters(request.args)
+    with read_conn() as c:
+        reports, next_after = dashboard_page(c, f, request.args.get("after", ""))
+    page_args = {k: v for k, v in f.items() if v}
+    return jsonify({"html": render_template("dashboard_rows.html", reports=reports), "rows": len(reports),
+                    "next_after": next_after,
+                    "next_url": url_for("dashboard_rows", after=next_after, **page_args) if next_after else None})
 
 @app.route("/create", methods=["GET","POST"])
 def create():
-    init_db()
     if request.method == "POST":
         report_id = request.form.get("report_id","").strip()
         project = request.form.get("project","").strip()
@@ -258,27 +724,70 @@ def create():
             if exists:
                 flash("Report ID already exists. Use a new ID.", "danger")
                 return redirect(url_for("create"))
+            ts = now()
+            row = dict(report_id=report_id, project=project, week=week, owner=owner, report_type=report_type,
+                       status=status, storage_url=storage_url, created_at=ts, updated_at=ts)
             c.execute("""INSERT INTO reports
                 (report_id, project, week, owner, report_type, status, storage_url, created_at, updated_at)
-                VALUES (?,?,?,?,?,?,?,?,?)""", (report_id, project, week, owner, report_type, status, storage_url, now(), now()))
+                VALUES (:report_id,:project,:week,:owner,:report_type,:status,:storage_url,:created_at,:updated_at)""", row)
+            log_change(c, "report", report_id, row, ts)
+        data_changed()
         flash("Report created.", "success")
         return redirect(url_for("report_detail", report_id=report_id))
     return render_template("create.html", active="dashboard")
 
 @app.route("/report/<report_id>")
 def report_detail(report_id):
-    init_db()
-    with conn() as c:
+    archived = "archived" in request.args
+    if archived:
+        body = render_report_detail(report_id, archived)
+    else:
+        key = ("report", report_id, os.path.exists(archive_path()))
+        body = fragment_cache.fragment(key, response_cache.generation, lambda: report_version(report_id),
+                                       lambda version: render_report_detail(report_id) if version else None)
+    if body is None:
+        return "Report not found", 404
+    return render_template("report_detail.html", active="dashboard", report_id=report_id, fragment=body)
+
+def report_version(report_id):
+    """What the report page shows changes with: updated_at, plus the latest snapshot id and version
+    number since updated_at only has one-second resolution. None for an unknown report."""
+    with read_conn() as c:
+        row = c.execute("""SELECT r.updated_at, l.kpi_id,
+                                  (SELECT MAX(version_no) FROM versions v WHERE v.report_id = r.report_id)
+                           FROM reports r LEFT JOIN kpi_latest l ON l.report_id = r.report_id
+                           WHERE r.report_id=?""", (report_id,)).fetchone()
+    return tuple(row) if row else None
+
+def render_report_detail(report_id, archived=False):
+    """The report page body (report, latest KPI, versions), or None for an unknown report."""
+    with read_conn() as c:
         report = c.execute("SELECT * FROM reports WHERE report_id=?", (report_id,)).fetchone()
         if not report:
-            return "Report not found", 404
-        versions = c.execute("SELECT * FROM versions WHERE report_id=? ORDER BY version_no DESC", (report_id,)).fetchall()
-        kpi_latest = c.execute("SELECT * FROM kpis WHERE report_id=? ORDER BY created_at DESC LIMIT 1", (report_id,)).fetchone()
-    return render_template("report_detail.html", active="dashboard", report=report, versions=versions, kpi=kpi_latest)
+            return None
+        kpi = latest_kpi(c, report_id)
+        with archive.attached(c, archive_path(), enabled=archived) as across:
+            versions = c.execute(f"""SELECT * FROM {archive.history_sql("versions", across)}
+                                     WHERE report_id=? ORDER BY version_no DESC""", (report_id,)).fetchall()
+    return render_template("report_detail_body.html", report=report, versions=versions, kpi=kpi,
+                           has_archive=os.path.exists(archive_path()), archived=archived)
+
+@app.route("/api/reports/<report_id>/history")
+def api_report_history(report_id):
+    """All KPI snapshots and versions of a report, oldest first; ?archived=1 includes the archive database."""
+    with read_conn() as c:
+        if not c.execute("SELECT 1 FROM reports WHERE report_id=?", (report_id,)).fetchone():
+            return jsonify({"error": "report not found"}), 404
+        with archive.attached(c, archive_path(), enabled=_flag("archived")) as archived:
+            kpis = c.execute(f"""SELECT * FROM {archive.history_sql("kpis", archived)}
+                                 WHERE report_id=? ORDER BY created_at, id""", (report_id,)).fetchall()
+            versions = c.execute(f"""SELECT * FROM {archive.history_sql("versions", archived)}
+                                     WHERE report_id=? ORDER BY version_no""", (report_id,)).fetchall()
+    return jsonify({"report_id": report_id, "archived": archived,
+                    "kpis": [dict(r) for r in kpis], "versions": [dict(r) for r in versions]})
 
 @app.route("/add_version/<report_id>", methods=["POST"])
 def add_version(report_id):
-    init_db()
     notes = request.form.get("notes","").strip()
     if not notes:
         flash("Version notes are required.", "danger")
@@ -286,121 +795,281 @@ def add_version(report_id):
     with conn() as c:
         mx = c.execute("SELECT COALESCE(MAX(version_no),0) AS mx FROM versions WHERE report_id=?", (report_id,)).fetchone()["mx"]
         vno = int(mx) + 1
+        ts = now()
         c.execute("INSERT INTO versions(report_id, version_no, notes, created_at) VALUES(?,?,?,?)",
-                  (report_id, vno, notes, now()))
-        c.execute("UPDATE reports SET updated_at=? WHERE report_id=?", (now(), report_id))
+                  (report_id, vno, notes, ts))
+        c.execute("UPDATE reports SET updated_at=? WHERE report_id=?", (ts, report_id))
+        log_change(c, "version", report_id, {"version_no": vno, "notes": notes, "created_at": ts}, ts)
+    data_changed()
     flash(f"Saved version v{vno}.", "success")
     return redirect(url_for("report_detail", report_id=report_id))
 
 @app.route("/add_kpi/<report_id>", methods=["POST"])
 def add_kpi(report_id):
-    init_db()
-    def _to_int(v, default=0):
-        try: return int(v)
-        except Exception: return default
-    def _to_float(v, default=0.0):
-        try: return float(v)
-        except Exception: return default
-
-    sla = _to_float(request.form.get("sla","0"))
-    p1 = _to_int(request.form.get("p1_incidents","0"))
-    mttr = _to_int(request.form.get("mttr_minutes","0"))
-    risks = _to_int(request.form.get("risk_count","0"))
-    rag = request.form.get("rag","Green").strip()
+    ts = now()
+    values, errors = validate_kpi({**request.form.to_dict(), "report_id": report_id, "created_at": ""}, ts)
+    if errors:
+        flash("KPI snapshot not saved: " + "; ".join(f"{k} {v}" for k, v in errors.items()), "danger")
+        return redirect(url_for("report_detail", report_id=report_id))
 
     with conn() as c:
-        c.execute("""INSERT INTO kpis(report_id, sla, p1_incidents, mttr_minutes, risk_count, rag, created_at)
-                     VALUES(?,?,?,?,?,?,?)""", (report_id, sla, p1, mttr, risks, rag, now()))
-        c.execute("UPDATE reports SET updated_at=? WHERE report_id=?", (now(), report_id))
-    flash("KPI snapshot saved.", "success")
+        values = rate_values(values, load_engine(c).rate)
+        if values[5] is None:
+            flash("KPI snapshot not saved: choose a RAG status (no KPI rules to compute it).", "danger")
+            return redirect(url_for("report_detail", report_id=report_id))
+        kpi_id = c.execute("""INSERT INTO kpis(report_id, sla, p1_incidents, mttr_minutes, risk_count, rag, created_at)
+                              VALUES(?,?,?,?,?,?,?)""", values).lastrowid
+        c.execute("UPDATE reports SET updated_at=? WHERE report_id=?", (ts, report_id))
+        log_change(c, "kpi", report_id, {"id": kpi_id, **dict(zip(KPI_FIELDS[1:], values[1:]))}, ts)
+    data_changed()
+    flash(f"KPI snapshot saved ({values[5]}).", "success")
     return redirect(url_for("report_detail", report_id=report_id))
 
-def _ppt_add_bullets(slide, title, bullets):
-    slide.shapes.title.text = title
-    tf = slide.shapes.placeholders[1].text_frame
-    tf.clear()
-    for i, b in enumerate(bullets):
-        p = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
-        p.text = b
-        p.level = 0
-        p.font.size = Pt(18)
+def _upload_rows():
+    """parse_rows() over a multipart "file" or the raw body; format from ?format= or the content type."""
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+    mimetype = upload.mimetype if upload else request.mimetype
+    fmt = request.args.get("format") or ("csv" if mimetype in ("text/csv", "application/csv") else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        return None
+    return parse_rows(stream, fmt)
+
+def _flag(name):
+    return request.args.get(name, "").lower() in ("1", "true", "yes")
+
+@app.route("/api/kpis/bulk", methods=["POST"])
+def api_kpis_bulk():
+    rows = _upload_rows()
+    if rows is None:
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+
+    # Read and validate the whole upload before taking the (single, per process) write connection.
+    ts = now()
+    with read_conn() as c:
+        summary, good = check_kpis(c, rows, ts, rate=load_engine(c).rate)
+    with conn() as c:
+        insert_kpis(c, summary, good, ts, atomic=_flag("atomic"))
+        if summary["inserted"]:
+            log_change(c, "kpis_bulk", None, {k: summary[k] for k in ("inserted", "reports_updated")}, ts)
+    if summary["inserted"]:
+        data_changed()
+    return jsonify(summary), 200 if summary["inserted"] or not summary["rejected"] else 400
+
+def _profile_deck_job(job):
+    profiler.observe("gpse_ppt_job_seconds", job["kind"], job["seconds"])
+
+deck_jobs = DeckJobs(workers=app.config["PPT_WORKERS"], max_pending=app.config["PPT_MAX_PENDING"],
+                     on_finish=[_profile_deck_job])
+
+def load_deck(c, report_id):
+    """Everything a report deck shows, as plain dicts (picklable for the worker pool)."""
+    report = c.execute("SELECT * FROM reports WHERE report_id=?", (report_id,)).fetchone()
+    if not report:
+        return None
+    kpi = latest_kpi(c, report_id)
+    versions = c.execute("SELECT * FROM versions WHERE report_id=? ORDER BY version_no DESC LIMIT 5", (report_id,)).fetchall()
+    return {"report": dict(report), "kpi": dict(kpi) if kpi else None,
+            "versions": [dict(v) for v in versions], "generated": now()}
+
+BULK_DECK_MAX = 2000
+
+def load_decks(c, week="", project=""):
+    """load_deck() for every report in a week and/or project, in two batched queries."""
+    where, params = "WHERE 1=1", []
+    if week:
+        where += " AND r.week=?"; params.append(week)
+    if project:
+        where += " AND r.project=?"; params.append(project)
+    rows = c.execute(f"""SELECT r.*, k.id AS k_id, k.sla AS k_sla, k.p1_incidents AS k_p1_incidents,
+               k.mttr_minutes AS k_mttr_minutes, k.risk_count AS k_risk_count, k.rag AS k_rag, k.created_at AS k_created_at
+        FROM reports r
+        LEFT JOIN kpi_latest l ON l.report_id = r.report_id
+        LEFT JOIN kpis k ON k.id = l.kpi_id
+        {where}
+        ORDER BY r.project, r.week, r.report_id
+        LIMIT ?""", params + [BULK_DECK_MAX + 1]).fetchall()
+    versions = {}
+    for v in c.execute(f"""SELECT id, report_id, version_no, notes, created_at FROM (
+            SELECT v.*, ROW_NUMBER() OVER (PARTITION BY v.report_id ORDER BY v.version_no DESC) AS rn
+            FROM versions v JOIN reports r ON r.report_id = v.report_id
+            {where})
+        WHERE rn <= 5 ORDER BY report_id, version_no DESC""", params):
+        versions.setdefault(v["report_id"], []).append(dict(v))
+    generated = now()
+    decks = []
+    for r in rows:
+        d = dict(r)
+        kpi = {k[2:]: d.pop(k) for k in list(d) if k.startswith("k_")}
+        decks.append({"report": d, "kpi": kpi if kpi["id"] is not None else None,
+                      "versions": versions.get(d["report_id"], []), "generated": generated})
+    return decks
+
+def _submit_bulk(week, project, mode):
+    with read_conn() as c:
+        decks = load_decks(c, week, project)
+    if not decks:
+        raise LookupError("No reports match the selected week/project.")
+    if len(decks) > BULK_DECK_MAX:
+        raise ValueError(f"More than {BULK_DECK_MAX} reports match; narrow the week/project.")
+    label = " ".join(x for x in (project, week) if x)
+    return deck_jobs.submit_bulk(decks, PPT_DIR, f"review_{label or 'all'}", mode=mode,
+                                 title=f"Weekly review — {label or 'all reports'}",
+                                 subtitle=f"{len(decks)} reports | Generated: {now()}")
+
+def _job_json(job):
+    return {**job, "status_url": url_for("api_ppt_job", job_id=job["id"]),
+            "download_url": url_for("api_ppt_job_download", job_id=job["id"])}
 
 @app.route("/generate_ppt/<report_id>", methods=["POST"])
 def generate_ppt(report_id):
-    init_db()
-    if not PPTX_OK:
+    if not pptx_available():
         flash("python-pptx not installed. Ask IT to allow install or remove PPT feature for demo.", "warning")
         return redirect(url_for("report_detail", report_id=report_id))
 
-    with conn() as c:
-        report = c.execute("SELECT * FROM reports WHERE report_id=?", (report_id,)).fetchone()
-        if not report:
-            flash("Report not found.", "danger")
-            return redirect(url_for("dashboard"))
-        kpi = c.execute("SELECT * FROM kpis WHERE report_id=? ORDER BY created_at DESC LIMIT 1", (report_id,)).fetchone()
-        versions = c.execute("SELECT * FROM versions WHERE report_id=? ORDER BY version_no DESC LIMIT 5", (report_id,)).fetchall()
-
-    prs = Presentation()
-    s0 = prs.slides.add_slide(prs.slide_layouts[0])
-    s0.shapes.title.text = f"{report['project']} — {report['week']} ({report['report_type']})"
-    s0.placeholders[1].text = f"Report ID: {report['report_id']} | Owner: {report['owner']} | Status: {report['status']}\nGenerated: {now()}"
-
-    s1 = prs.slides.add_slide(prs.slide_layouts[1])
-    bullets = [f"SLA: {kpi['sla']}%", f"P1 Incidents: {kpi['p1_incidents']}", f"MTTR: {kpi['mttr_minutes']} min",
-               f"Risk Count: {kpi['risk_count']}", f"RAG Status: {kpi['rag']}"] if kpi else ["No KPI snapshot found yet."]
-    _ppt_add_bullets(s1, "KPIs (Latest Snapshot)", bullets)
-
-    s2 = prs.slides.add_slide(prs.slide_layouts[1])
-    bullets = [f"v{v['version_no']}: {v['notes']}" for v in versions] if versions else ["No versions recorded yet."]
-    _ppt_add_bullets(s2, "Recent Versions / Notes", bullets)
-
-    filename = f"{report_id}_{report['project']}_{report['week']}.pptx".replace(" ", "_")
-    out_path = os.path.join(PPT_DIR, filename)
-    prs.save(out_path)
-
-    flash("PPT generated successfully. Check output_ppt/ folder.", "success")
+    with read_conn() as c:
+        deck = load_deck(c, report_id)
+    if not deck:
+        flash("Report not found.", "danger")
+        return redirect(url_for("dashboard"))
+    try:
+        job = deck_jobs.submit_deck(deck, PPT_DIR)
+    except QueueFull:
+        flash("PPT queue is full, try again in a minute.", "warning")
+        return redirect(url_for("report_detail", report_id=report_id))
+
+    if job["cached"]:
+        flash(f"PPT is up to date: output_ppt/{job['file']}", "success")
+    else:
+        flash(f"PPT generation started (job {job['id'][:8]}). It will appear in output_ppt/{job['file']}.", "success")
     return redirect(url_for("report_detail", report_id=report_id))
 
+@app.route("/api/reports/<report_id>/ppt", methods=["POST"])
+def api_ppt_enqueue(report_id):
+    if not pptx_available():
+        return jsonify({"error": "python-pptx not installed"}), 503
+    with read_conn() as c:
+        deck = load_deck(c, report_id)
+    if not deck:
+        return jsonify({"error": "Report not found"}), 404
+    try:
+        job = deck_jobs.submit_deck(deck, PPT_DIR)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 429
+    return jsonify(_job_json(job)), 200 if job["status"] == "done" else 202
+
+@app.route("/generate_ppt_bulk", methods=["POST"])
+def generate_ppt_bulk():
+    week = request.form.get("week", "").strip()
+    project = request.form.get("project", "").strip()
+    mode = "zip" if request.form.get("mode") == "zip" else "combined"
+    back = redirect(url_for("dashboard", week=week or None, project=project or None))
+    if not pptx_available():
+        flash("python-pptx not installed. Ask IT to allow install or remove PPT feature for demo.", "warning")
+        return back
+    if not (week or project):
+        flash("Pick a week and/or project for the review deck.", "danger")
+        return back
+    try:
+        job = _submit_bulk(week, project, mode)
+    except (LookupError, ValueError) as e:
+        flash(str(e), "danger")
+        return back
+    except QueueFull:
+        flash("PPT queue is full, try again in a minute.", "warning")
+        return back
+    if job["cached"]:
+        flash(f"Review deck is up to date: output_ppt/{job['file']}", "success")
+    else:
+        flash(f"Review deck for {job['reports']} reports started (job {job['id'][:8]}). "
+              f"It will appear in output_ppt/{job['file']}.", "success")
+    return back
+
+@app.route("/api/ppt_jobs/bulk", methods=["POST"])
+def api_ppt_bulk():
+    if not pptx_available():
+        return jsonify({"error": "python-pptx not installed"}), 503
+    args = request.get_json(silent=True) or request.values
+    week = (args.get("week") or "").strip()
+    project = (args.get("project") or "").strip()
+    mode = args.get("mode") or "combined"
+    if mode not in ("combined", "zip"):
+        return jsonify({"error": "mode must be 'combined' or 'zip'"}), 400
+    if not (week or project):
+        return jsonify({"error": "week and/or project is required"}), 400
+    try:
+        job = _submit_bulk(week, project, mode)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 429
+    return jsonify(_job_json(job)), 200 if job["status"] == "done" else 202
+
+@app.route("/api/ppt_jobs/<job_id>")
+def api_ppt_job(job_id):
+    job = deck_jobs.get(job_id, PPT_DIR)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(_job_json(job))
+
+@app.route("/api/ppt_jobs/<job_id>/download")
+def api_ppt_job_download(job_id):
+    job = deck_jobs.get(job_id, PPT_DIR)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    path = deck_jobs.artifact(job_id, PPT_DIR)
+    if not path:
+        return jsonify({"error": f"Job is {job['status']}", "job": _job_json(job)}), 409
+    return send_file(path, as_attachment=True, download_name=job["file"])
+
 @app.route("/kpi-library")
 def kpi_library():
-    init_db()
     return render_template("kpi_library.html", active="kpi_library")
 
 @app.route("/api/departments")
+@cached_response
 def api_departments():
-    init_db()
-    with conn() as c:
+    with read_conn() as c:
         rows = c.execute("SELECT dept_id, dept_name FROM departments ORDER BY dept_name").fetchall()
     return jsonify([dict(r) for r in rows])
 
 @app.route("/api/kpis_list")
+@cached_response
 def api_kpis_list():
-    init_db()
     dept_id = request.args.get("dept_id","").strip()
     section = request.args.get("section","").strip()
     search = request.args.get("search","").strip().lower()
 
-    sql = "SELECT kpi_id, section, kpi_key, kpi_name, updated_at FROM kpi_master WHERE 1=1"
+    sql = "SELECT km.kpi_id, km.section, km.kpi_key, km.kpi_name, km.updated_at FROM kpi_master km"
     params = []
+    order = "km.section ASC, km.kpi_name ASC"
+    match = fts_query(search) if FTS5_OK else ""
+    if match:
+        sql += " JOIN kpi_master_fts ON kpi_master_fts.rowid = km.kpi_id AND kpi_master_fts MATCH ?"
+        params.append(match)
+        order = f"{KPI_FTS_RANK}, {order}"
+    sql += " WHERE 1=1"
     if dept_id:
-        sql += " AND dept_id=?"; params.append(dept_id)
+        sql += " AND km.dept_id=?"; params.append(dept_id)
     if section:
-        sql += " AND section=?"; params.append(section)
-    if search:
-        sql += " AND (lower(kpi_key) LIKE ? OR lower(kpi_name) LIKE ? OR lower(section) LIKE ?)"
+        sql += " AND km.section=?"; params.append(section)
+    if search and not match:
+        sql += " AND (lower(km.kpi_key) LIKE ? OR lower(km.kpi_name) LIKE ? OR lower(km.section) LIKE ?)"
         params += [f"%{search}%", f"%{search}%", f"%{search}%"]
-    sql += " ORDER BY section ASC, kpi_name ASC"
+    sql += f" ORDER BY {order}"
 
-    with conn() as c:
+    with read_conn() as c:
         rows = c.execute(sql, params).fetchall()
     return jsonify([dict(r) for r in rows])
 
 @app.route("/api/kpi/<int:kpi_id>")
+@cached_response
 def api_kpi_detail(kpi_id):
-    init_db()
-    with conn() as c:
-        row = c.execute("""
-        SELECT km.*, d.dept_name
+    with read_conn() as c:
+        row = c.execute(f"""
+        SELECT {", ".join("km." + col for col in KPI_PUBLIC_COLUMNS)}, d.dept_name
         FROM kpi_master km
         JOIN departments d ON d.dept_id = km.dept_id
         WHERE km.kpi_id=?
@@ -410,32 +1079,60 @@ def api_kpi_detail(kpi_id):
     return jsonify(dict(row))
 
 @app.route("/api/kpi_master")
+@cached_response
 def api_kpi_master():
-    init_db()
+    return feed_response(KPI_MASTER_FEED)
+
+@app.route("/api/kpi_master/import", methods=["POST"])
+def api_kpi_master_import():
+    """Sync KPI definitions shaped like /export/kpi_library.csv; ?prune=1 also deletes the uploaded
+    departments' unlisted KPIs, ?recompute_rag=1 re-rates snapshots if a RAG rule changed."""
+    rows = _upload_rows()
+    if rows is None:
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+    rows = list(rows)  # the whole (small) library file, read before taking the write connection
     with conn() as c:
-        rows = c.execute("""
-        SELECT d.dept_name, km.section, km.kpi_key, km.kpi_name, km.formula_display,
-               km.description, km.calculation_notes, km.green_rule, km.amber_rule, km.red_rule,
-               km.owner_team, km.updated_at
-        FROM kpi_master km
-        JOIN departments d ON d.dept_id = km.dept_id
-        ORDER BY d.dept_name, km.section, km.kpi_name
-        """).fetchall()
-    return jsonify([dict(r) for r in rows])
+        summary = import_kpi_library(c, rows, atomic=_flag("atomic"), prune=_flag("prune"),
+                                     recompute=_flag("recompute_rag"))
+    written = summary["inserted"] or summary["updated"] or summary["deleted"]
+    if summary.get("snapshots_rerated"):
+        fragment_cache.invalidate()  # RAG changed without touching reports.updated_at
+    if written:
+        data_changed()
+    return jsonify(summary), 200 if written or not summary["rejected"] else 400
+
+def import_kpi_library(c, rows, atomic=False, prune=False, recompute=False):
+    ts = now()
+    summary = sync_library(c, rows, ts, atomic=atomic, prune=prune)
+    if summary["rag_rules_changed"] and recompute:
+        summary["snapshots_rerated"] = recompute_rag(c)
+    if summary["inserted"] or summary["updated"] or summary["deleted"]:
+        log_change(c, "kpi_library", None, {k: summary[k] for k in ("inserted", "updated", "deleted")}, ts)
+    return summary
 
 @app.route("/utilities")
 def utilities():
-    init_db()
     return render_template("utilities.html", active="utilities")
 
 @app.route("/assistant")
 def assistant():
-    init_db()
     q = request.args.get("q","").strip()
     results = []
-    if q:
+    match = fts_query(q, any_term=True) if FTS5_OK else ""
+    if match:
+        with read_conn() as c:
+            results = c.execute(f"""
+            SELECT km.kpi_name, km.kpi_key, km.section, km.formula_display, d.dept_name
+            FROM kpi_master_fts
+            JOIN kpi_master km ON km.kpi_id = kpi_master_fts.rowid
+            JOIN departments d ON d.dept_id = km.dept_id
+            WHERE kpi_master_fts MATCH ?
+            ORDER BY {KPI_FTS_RANK}
+            LIMIT 50
+            """, (match,)).fetchall()
+    elif q:
         ql = q.lower()
-        with conn() as c:
+        with read_conn() as c:
             results = c.execute("""
             SELECT km.kpi_name, km.kpi_key, km.section, km.formula_display, d.dept_name
             FROM kpi_master km
@@ -446,104 +1143,423 @@ def assistant():
             """, (f"%{ql}%", f"%{ql}%", f"%{ql}%", f"%{ql}%")).fetchall()
     return render_template("assistant.html", active="assistant", q=q, results=results)
 
+# Power BI feeds. Each feed is served in full by default; with limit= and/or
+# after= it is paged by key (keyset pagination) and wrapped as
+# {"data": [...], "next_after": <key of the last row or null>}.
+# fields= projects columns and updated_since= returns only rows changed since then.
+FEED_PAGE_SIZE = 1000
+FEED_MAX_PAGE_SIZE = 10000
+_HUB_URL_SQL = "'" + HUB_URL.replace("'", "''") + "' || r.report_id"
+
+REPORTS_FEED = {
+    "from": "reports r",
+    "key": "r.report_id",
+    "updated": "r.updated_at",
+    "columns": {
+        "report_id": "r.report_id", "project": "r.project", "week": "r.week", "owner": "r.owner",
+        "report_type": "r.report_type", "status": "r.status", "storage_url": "r.storage_url",
+        "created_at": "r.created_at", "updated_at": "r.updated_at", "hub_url": _HUB_URL_SQL,
+    },
+}
+
+KPIS_FEED = {
+    "from": """reports r
+        LEFT JOIN kpi_latest l ON l.report_id = r.report_id
+        LEFT JOIN kpis k ON k.id = l.kpi_id""",
+    "key": "r.report_id",
+    "updated": "r.updated_at",
+    "columns": {
+        "report_id": "r.report_id", "project": "r.project", "week": "r.week", "owner": "r.owner",
+        "report_type": "r.report_type", "status": "r.status", "sla": "k.sla", "p1_incidents": "k.p1_incidents",
+        "mttr_minutes": "k.mttr_minutes", "risk_count": "k.risk_count", "rag": "k.rag",
+        "created_at": "k.created_at", "hub_url": _HUB_URL_SQL,
+    },
+}
+
+KPI_MASTER_FEED = {
+    "from": "kpi_master km JOIN departments d ON d.dept_id = km.dept_id",
+    "key": "km.kpi_id",
+    "updated": "km.updated_at",
+    "order": "d.dept_name, km.section, km.kpi_name",
+    "columns": {
+        "dept_name": "d.dept_name", "section": "km.section", "kpi_key": "km.kpi_key", "kpi_name": "km.kpi_name",
+        "formula_display": "km.formula_display", "description": "km.description",
+        "calculation_notes": "km.calculation_notes", "green_rule": "km.green_rule", "amber_rule": "km.amber_rule",
+        "red_rule": "km.red_rule", "owner_team": "km.owner_team", "updated_at": "km.updated_at",
+    },
+    "extra_columns": {"kpi_id": "km.kpi_id", "dept_id": "km.dept_id"},
+}
+
+def feed_response(feed):
+    columns = {**feed["columns"], **feed.get("extra_columns", {})}
+    fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()] or list(feed["columns"])
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        return jsonify({"error": f"Unknown field(s): {', '.join(unknown)}", "fields": list(columns)}), 400
+
+    limit = request.args.get("limit", "").strip()
+    after = request.args.get("after", "").strip()
+    since = request.args.get("updated_since", "").strip()
+    paged = bool(limit or after)
+    if paged:
+        try:
+            limit = min(max(int(limit or FEED_PAGE_SIZE), 1), FEED_MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+
+    # Incremental pulls page in (updated, key) order so they walk the updated_at
+    # index; their cursor is "<updated>|<key>".
+    key = f"({feed['updated']}, {feed['key']})" if since else feed["key"]
+    select = ", ".join(f"{columns[f]} AS {f}" for f in fields)
+    sql = f"SELECT {select}, {feed['updated']} AS _updated, {feed['key']} AS _key FROM {feed['from']} WHERE 1=1"
+    params = []
+    if since:
+        sql += f" AND {feed['updated']} >= ?"; params.append(since)
+    if after and since:
+        updated, _, after_key = after.partition("|")
+        sql += f" AND {key} > (?, ?)"; params += [updated, after_key]
+    elif after:
+        sql += f" AND {key} > ?"; params.append(after)
+    if paged:
+        sql += f" ORDER BY {key.strip('()')} LIMIT ?"; params.append(limit)
+    elif feed.get("order"):
+        sql += f" ORDER BY {feed['order']}"
+
+    with read_conn() as c:
+        rows = c.execute(sql, params).fetchall()
+    data = [{f: r[f] for f in fields} for r in rows]
+    if not paged:
+        return jsonify(data)
+    next_after = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_after = f"{last['_updated']}|{last['_key']}" if since else last["_key"]
+    return jsonify({"data": data, "next_after": next_after})
+
 @app.route("/api/reports")
+@cached_response
 def api_reports():
-    init_db()
-    with conn() as c:
-        rows = c.execute("SELECT * FROM reports").fetchall()
-    out = []
-    for r in rows:
-        d = dict(r)
-        d["hub_url"] = f"http://127.0.0.1:5000/report/{d['report_id']}"
-        out.append(d)
-    return jsonify(out)
+    return feed_response(REPORTS_FEED)
 
 @app.route("/api/kpis")
+@cached_response
 def api_kpis():
-    init_db()
-    with conn() as c:
-        rows = c.execute("""SELECT
-              r.report_id, r.project, r.week, r.owner, r.report_type, r.status,
-              k.sla, k.p1_incidents, k.mttr_minutes, k.risk_count, k.rag, k.created_at
-            FROM reports r
-            LEFT JOIN (
-              SELECT kk.*
-              FROM kpis kk
-              INNER JOIN (SELECT report_id, MAX(created_at) AS mc FROM kpis GROUP BY report_id) latest
-              ON latest.report_id = kk.report_id AND latest.mc = kk.created_at
-            ) k
-            ON k.report_id = r.report_id""").fetchall()
-    out = []
+    return feed_response(KPIS_FEED)
+
+def mttr_percentiles(buckets, total, percentiles):
+    """Nearest-rank percentiles from sorted (bucket, n) pairs; values are bucket lower bounds."""
+    out, seen, i = {}, 0, 0
+    targets = sorted((max(1, -(-p * total // 100)), p) for p in percentiles)
+    for bucket, n in buckets:
+        seen += n
+        while i < len(targets) and seen >= targets[i][0]:
+            out[f"mttr_p{targets[i][1]}"] = bucket
+            i += 1
+    return {f"mttr_p{p}": out.get(f"mttr_p{p}") for p in percentiles}
+
+@app.route("/api/kpi_trends")
+@cached_response
+def api_kpi_trends():
+    by = [d for d in request.args.get("by", "week").split(",") if d]
+    if any(d not in ROLLUP_KEYS for d in by) or len(set(by)) != len(by):
+        return jsonify({"error": f"by must be a comma-separated subset of {', '.join(ROLLUP_KEYS)}"}), 400
+    try:
+        percentiles = [int(p) for p in request.args.get("percentiles", "50,90").split(",") if p]
+    except ValueError:
+        percentiles = [-1]
+    if any(not 0 < p <= 100 for p in percentiles):
+        return jsonify({"error": "percentiles must be integers in 1..100"}), 400
+
+    where, params = "", []
+    for key in ROLLUP_KEYS:
+        if request.args.get(key):
+            where += f" AND {key}=?"; params.append(request.args[key])
+    dims = ", ".join(by)
+    group = f" GROUP BY {dims} ORDER BY {dims}" if by else ""
+    with read_conn() as c:
+        rows = c.execute(f"""SELECT {dims + "," if by else ""}
+              SUM(snapshots) AS snapshots,
+              ROUND(SUM(sla_sum) / SUM(sla_n), 3) AS avg_sla,
+              SUM(p1_sum) AS total_p1,
+              ROUND(1.0 * SUM(mttr_sum) / SUM(mttr_n), 1) AS avg_mttr,
+              SUM(mttr_n) AS mttr_n,
+              SUM(risk_sum) AS total_risks,
+              SUM(green) AS green, SUM(amber) AS amber, SUM(red) AS red
+            FROM kpi_rollup WHERE snapshots > 0{where}{group}""", params).fetchall()
+        hist = {}
+        for h in c.execute(f"""SELECT {dims + "," if by else ""} bucket, SUM(n) AS n FROM kpi_mttr_hist
+                               WHERE n > 0{where} GROUP BY {dims + "," if by else ""} bucket
+                               ORDER BY {dims + "," if by else ""} bucket""", params):
+            hist.setdefault(tuple(h[d] for d in by), []).append((h["bucket"], h["n"]))
+
+    series = []
     for r in rows:
-        d = dict(r)
-        d["hub_url"] = f"http://127.0.0.1:5000/report/{d['report_id']}"
-        out.append(d)
-    return jsonify(out)
+        item = dict(r)
+        mttr_n = item.pop("mttr_n")
+        item.update(mttr_percentiles(hist.get(tuple(r[d] for d in by), []), mttr_n or 0, percentiles))
+        series.append(item)
+    return jsonify({"by": by, "series": series})
+
+EXPORT_BATCH = 1000
+
+KPI_EXPORT_COLUMNS = ["report_id","project","week","owner","report_type","status","sla","p1_incidents",
+                      "mttr_minutes","risk_count","rag","kpi_updated_at","hub_url"]
+KPI_EXPORT_SQL = """SELECT
+      r.report_id, r.project, r.week, r.owner, r.report_type, r.status,
+      k.sla, k.p1_incidents, k.mttr_minutes, k.risk_count, k.rag, k.created_at AS kpi_updated_at,
+      ? || r.report_id AS hub_url
+    FROM reports r
+    LEFT JOIN kpi_latest l ON l.report_id = r.report_id
+    LEFT JOIN kpis k ON k.id = l.kpi_id
+    ORDER BY r.week DESC, r.project ASC"""
+
+KPI_LIBRARY_COLUMNS = ["dept_name","section","kpi_key","kpi_name","formula_display","description","calculation_notes",
+                       "green_rule","amber_rule","red_rule","owner_team","updated_at"]
+
+def _export_batches(sql, params=()):
+    with read_conn() as c:
+        cur = c.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(EXPORT_BATCH)
+            if not rows:
+                break
+            yield rows
+
+def _csv_chunks(columns, batches):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(columns)
+    for rows in batches:
+        w.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+def _ndjson_chunks(batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(r), ensure_ascii=False) + "\n" for r in rows)
+
+def _gzip_chunks(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = z.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield z.flush()
+
+def export_response(fmt, columns, sql, params=(), download_name="export"):
+    """Stream a query as CSV or NDJSON in EXPORT_BATCH-row chunks (gzip if the client accepts it)."""
+    batches = _export_batches(sql, params)
+    if fmt == "csv":
+        chunks, mimetype = _csv_chunks(columns, batches), "text/csv"
+    else:
+        chunks, mimetype = _ndjson_chunks(batches), "application/x-ndjson"
+    headers = {"Content-Disposition": f"attachment; filename={download_name}.{fmt}", "Vary": "Accept-Encoding"}
+    if "gzip" in request.accept_encodings:
+        headers["Content-Encoding"] = "gzip"
+        return Response(_gzip_chunks(chunks), mimetype=mimetype, headers=headers)
+    return Response((chunk.encode("utf-8") for chunk in chunks), mimetype=mimetype, headers=headers)
+
+CHANGES_LIMIT = 500
+CHANGES_KEEPALIVE_SECONDS = 15
+
+def _since_arg(value):
+    return int(value) if value is not None and value.strip().isdigit() else None
+
+@app.route("/api/changes")
+def api_changes():
+    """Change log entries after ?since=<seq> (default 0), oldest first, for catching up."""
+    since = _since_arg(request.args.get("since", "0"))
+    if since is None:
+        return jsonify({"error": "since must be a sequence number"}), 400
+    limit = min(max(request.args.get("limit", CHANGES_LIMIT, type=int), 1), CHANGES_LIMIT)
+    with read_conn() as c:
+        rows, reset, newest = changes_since(c, since, limit)
+    return jsonify({"changes": rows, "reset": reset, "last_seq": rows[-1]["seq"] if rows else newest})
+
+@app.route("/api/changes/stream")
+def api_changes_stream():
+    """Server-Sent Events: one event per change log entry (event = kind, id = seq).
+
+    Starts after Last-Event-ID / ?since=, or at the current end of the log. A
+    "reset" event means the client missed entries and should reload. The stream
+    ends after CHANGES_STREAM_SECONDS and EventSource reconnects where it left off.
+    At most CHANGES_MAX_STREAMS run per process; further clients get a 503 and
+    should poll /api/changes instead.
+    """
+    if not change_streams.acquire(blocking=False):
+        retry = {"Retry-After": str(int(app.config["CHANGES_STREAM_SECONDS"]))}
+        return jsonify({"error": "too many open change streams; poll /api/changes instead"}), 503, retry
+    try:
+        return _changes_stream_response()
+    except BaseException:
+        change_streams.release()  # the slot is only handed to call_on_close once a response exists
+        raise
+
+def _changes_stream_response():
+    since = _since_arg(request.headers.get("Last-Event-ID") or request.args.get("since"))
+    if since is None:
+        with read_conn() as c:
+            since = last_seq(c)
+    poll, lifetime = app.config["CHANGES_POLL_SECONDS"], app.config["CHANGES_STREAM_SECONDS"]
+
+    def stream(last):
+        deadline = time.monotonic() + lifetime
+        quiet_since = time.monotonic()
+        yield f"retry: {int(poll * 1000)}\n\n"
+        while time.monotonic() < deadline:
+            version = change_notifier.version
+            with read_conn() as c:
+                rows, reset, newest = changes_since(c, last, CHANGES_LIMIT)
+            if reset:
+                yield sse_event(newest, "reset", {"last_seq": newest})
+                last = newest
+            for r in rows:
+                yield sse_event(r["seq"], r["kind"], r)
+                last = r["seq"]
+            if rows or reset:
+                quiet_since = time.monotonic()
+                if len(rows) == CHANGES_LIMIT:
+                    continue
+            elif time.monotonic() - quiet_since >= CHANGES_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                quiet_since = time.monotonic()
+            change_notifier.wait(version, min(poll, max(0.0, deadline - time.monotonic())))
+
+    response = Response(stream(since), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(change_streams.release)
+    return response
 
 @app.route("/export/kpis.csv")
+@app.route("/export/kpis.ndjson", endpoint="export_kpis_ndjson")
 def export_kpis_csv():
-    init_db()
-    with conn() as c:
-        rows = c.execute("""SELECT
-              r.report_id, r.project, r.week, r.owner, r.report_type, r.status,
-              k.sla, k.p1_incidents, k.mttr_minutes, k.risk_count, k.rag, k.created_at
-            FROM reports r
-            LEFT JOIN (
-              SELECT kk.*
-              FROM kpis kk
-              INNER JOIN (SELECT report_id, MAX(created_at) AS mc FROM kpis GROUP BY report_id) latest
-              ON latest.report_id = kk.report_id AND latest.mc = kk.created_at
-            ) k
-            ON k.report_id = r.report_id
-            ORDER BY r.week DESC, r.project ASC""").fetchall()
-
-    import io, csv
-    output = io.StringIO()
-    w = csv.writer(output)
-    w.writerow(["report_id","project","week","owner","report_type","status","sla","p1_incidents","mttr_minutes","risk_count","rag","kpi_updated_at","hub_url"])
-    for r in rows:
-        d = dict(r)
-        w.writerow([d.get("report_id",""), d.get("project",""), d.get("week",""), d.get("owner",""),
-                    d.get("report_type",""), d.get("status",""), d.get("sla",""), d.get("p1_incidents",""),
-                    d.get("mttr_minutes",""), d.get("risk_count",""), d.get("rag",""), d.get("created_at",""),
-                    f"http://127.0.0.1:5000/report/{d.get('report_id','')}"])
-    mem = io.BytesIO(output.getvalue().encode("utf-8"))
-    return send_file(mem, mimetype="text/csv", as_attachment=True, download_name="kpis_export.csv")
+    fmt = request.path.rsplit(".", 1)[1]
+    return export_response(fmt, KPI_EXPORT_COLUMNS, KPI_EXPORT_SQL, (HUB_URL,), "kpis_export")
 
 @app.route("/export/kpi_library.csv")
+@app.route("/export/kpi_library.ndjson", endpoint="export_kpi_master_ndjson")
 def export_kpi_master_csv():
-    init_db()
-    with conn() as c:
-        rows = c.execute("""
-        SELECT d.dept_name, km.section, km.kpi_key, km.kpi_name, km.formula_display,
-               km.description, km.calculation_notes, km.green_rule, km.amber_rule, km.red_rule,
-               km.owner_team, km.updated_at
-        FROM kpi_master km
-        JOIN departments d ON d.dept_id = km.dept_id
-        ORDER BY d.dept_name, km.section, km.kpi_name
-        """).fetchall()
-
-    import io, csv
-    output = io.StringIO()
-    w = csv.writer(output)
-    w.writerow(["dept_name","section","kpi_key","kpi_name","formula_display","description","calculation_notes","green_rule","amber_rule","red_rule","owner_team","updated_at"])
-    for r in rows:
-        d = dict(r)
-        w.writerow([d.get("dept_name",""), d.get("section",""), d.get("kpi_key",""), d.get("kpi_name",""),
-                    d.get("formula_display",""), d.get("description",""), d.get("calculation_notes",""),
-                    d.get("green_rule",""), d.get("amber_rule",""), d.get("red_rule",""),
-                    d.get("owner_team",""), d.get("updated_at","")])
-    mem = io.BytesIO(output.getvalue().encode("utf-8"))
-    return send_file(mem, mimetype="text/csv", as_attachment=True, download_name="kpi_library_export.csv")
+    fmt = request.path.rsplit(".", 1)[1]
+    return export_response(fmt, KPI_LIBRARY_COLUMNS, KPI_LIBRARY_SQL, (), "kpi_library_export")
 
 @app.route("/admin/reset-demo", methods=["POST"])
 def reset_demo():
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    # Deleting gpse.db only resets this process: other gunicorn workers (and pooled
+    # connections in general) would keep using the unlinked file. The production entry
+    # points turn DB_READ_POOL on, so that is the signal to refuse.
+    if app.config["DB_READ_POOL"]:
+        flash("Reset is only available on the development server (python app.py): "
+              "stop the service and delete the database file instead.", "danger")
+        return redirect(url_for("dashboard"))
+    close_pool()
+    # The archive goes too: the new database reuses snapshot and version ids.
+    for base in (DB_PATH, archive_path()):
+        for path in (base, base + "-wal", base + "-shm", base + "-journal"):
+            if os.path.exists(path):
+                os.remove(path)
     init_db()
+    with conn() as c:
+        log_change(c, "reset", None, {}, now())
+    fragment_cache.invalidate()
+    data_changed()
     flash("Demo database reset and re-seeded.", "success")
     return redirect(url_for("dashboard"))
 
+@app.route("/admin/db-stats")
+def db_stats():
+    stats = get_pool().stats()
+    if app.config["DB_READ_POOL"]:
+        stats["read_pool"] = get_read_pool().stats()
+    return jsonify(stats)
+
+@app.route("/admin/cache-stats")
+def cache_stats():
+    return jsonify({**response_cache.info(), "fragments": fragment_cache.info()})
+
+@app.route("/admin/profile")
+def profile_stats():
+    return jsonify({"enabled": app.config["PROFILING"], **profiler.snapshot()})
+
+@app.route("/metrics")
+def metrics():
+    gauges = [(f"gpse_db_pool_{k}", "Connection pool counter (see /admin/db-stats).", v)
+              for k, v in get_pool().stats().items()]
+    if app.config["DB_READ_POOL"]:
+        gauges += [(f"gpse_db_read_pool_{k}", "Read-only pool counter (see /admin/db-stats).", v)
+                   for k, v in get_read_pool().stats().items()]
+    gauges += [(f"gpse_response_cache_{k}", "Response cache counter (see /admin/cache-stats).", v)
+               for k, v in response_cache.info().items() if isinstance(v, (int, float))]
+    gauges += [(f"gpse_fragment_cache_{k}", "Fragment cache counter (see /admin/cache-stats).", v)
+               for k, v in fragment_cache.info().items() if isinstance(v, (int, float))]
+    return Response(profiler.prometheus(gauges), mimetype="text/plain; version=0.0.4")
+
+@app.cli.command("recompute-rag")
+def recompute_rag_command():
+    """Re-rate every KPI snapshot with the current kpi_master RAG rules."""
+    ensure_db()
+    t0 = datetime.now()
+    with conn() as c:
+        changed = recompute_rag(c)
+        if changed:
+            log_change(c, "rag_recomputed", None, {"snapshots": changed}, now())
+    data_changed()
+    print(f"{changed} snapshot(s) re-rated in {(datetime.now() - t0).total_seconds():.2f}s")
+
+@app.cli.command("import-kpi-library")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--prune", is_flag=True, help="Delete KPIs of the listed departments that the file omits.")
+@click.option("--recompute-rag", "recompute", is_flag=True, help="Re-rate snapshots if a RAG rule changed.")
+def import_kpi_library_command(path, prune, recompute):
+    """Sync kpi_master from a CSV or NDJSON file shaped like /export/kpi_library.csv."""
+    ensure_db()
+    fmt = "csv" if path.lower().endswith(".csv") else "ndjson"
+    with open(path, "rb") as f, conn() as c:
+        summary = import_kpi_library(c, parse_rows(f, fmt), prune=prune, recompute=recompute)
+    data_changed()
+    for e in summary.pop("errors"):
+        print(f"line {e['line']}: " + "; ".join(f"{k} {v}" for k, v in e["errors"].items()))
+    print(", ".join(f"{k}={v}" for k, v in summary.items()))
+
+@app.cli.command("archive")
+@click.option("--weeks", type=int, default=None, help="Archive rows older than this (default ARCHIVE_AFTER_WEEKS).")
+@click.option("--compact/--no-compact", "do_compact", default=True, help="VACUUM the hot database afterwards.")
+def archive_command(weeks, do_compact):
+    """Move old KPI snapshots and versions into the archive database."""
+    ensure_db()
+    weeks = app.config["ARCHIVE_AFTER_WEEKS"] if weeks is None else weeks
+    with conn() as c:
+        try:
+            moved = archive.archive_old(c, archive_path(), weeks)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        print(f"{moved['kpis']} snapshot(s) and {moved['versions']} version(s) before {moved['cutoff']} "
+              f"moved to {archive_path()}")
+        if do_compact:
+            sizes = archive.compact(c, DB_PATH)
+            print(f"{DB_PATH}: {sizes['bytes_before']:,} -> {sizes['bytes_after']:,} bytes")
+    data_changed()
+
+@app.cli.command("compact")
+def compact_command():
+    """VACUUM the database, truncate the WAL and rebuild the reports search index."""
+    ensure_db()
+    with conn() as c:
+        sizes = archive.compact(c, DB_PATH)
+    print(f"{DB_PATH}: {sizes['bytes_before']:,} -> {sizes['bytes_after']:,} bytes")
+
+def create_app(init=True):
+    """The hub with New.py's KPI catalogue blueprint registered; init=True migrates and seeds
+    the database now instead of on the first request. Importing this module does neither."""
+    if "kpi_catalog" not in app.blueprints:
+        from New import bp
+        app.extensions["gpse_read_conn"] = read_conn
+        app.register_blueprint(bp)
+    if init:
+        init_db()
+    return app
+
 if __name__ == "__main__":
-    init_db()
-    app.run(host="127.0.0.1", port=5000, debug=True, use_reloader=False)
+    create_app().run(host="127.0.0.1", port=5000, debug=True, use_reloader=False)
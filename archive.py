@@ -0,0 +1,127 @@
+"""Archival of old KPI snapshots and version notes into a second SQLite file.
+
+archive_old() moves kpis/versions rows older than a cutoff into the archive
+database (attached as "archive"), always leaving each report's latest
+snapshot and latest version in the hot tables. Rows keep their ids, so an
+interrupted run can simply be repeated; an id that is already archived with
+different content (an archive left over from another database) stops the run.
+The kpi_rollup / kpi_mttr_hist totals are not touched: trends keep counting
+archived snapshots. They stay in the project/week/type group the report had
+when they were archived; if the report is later moved, the rollup triggers
+only carry its hot snapshots over to the new group.
+
+compact() reclaims the freed pages of the hot database afterwards.
+History reads use history_sql(), which spans both files when asked to.
+"""
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ARCHIVE_SCHEMA = {
+    "kpis": """(id INTEGER PRIMARY KEY, report_id TEXT NOT NULL, sla REAL, p1_incidents INTEGER,
+               mttr_minutes INTEGER, risk_count INTEGER, rag TEXT, created_at TEXT NOT NULL)""",
+    "versions": """(id INTEGER PRIMARY KEY, report_id TEXT NOT NULL, version_no INTEGER NOT NULL,
+                   notes TEXT NOT NULL, created_at TEXT NOT NULL)""",
+}
+ARCHIVE_INDEXES = {
+    "idx_archive_kpis_report": "kpis(report_id, created_at)",
+    "idx_archive_versions_report": "versions(report_id, version_no)",
+}
+
+ARCHIVE_COLUMNS = {
+    "kpis": ("report_id", "sla", "p1_incidents", "mttr_minutes", "risk_count", "rag", "created_at"),
+    "versions": ("report_id", "version_no", "notes", "created_at"),
+}
+
+# Rows of main.<table> that may move: older than the cutoff and not the report's latest.
+_MOVABLE = {
+    "kpis": "created_at < ? AND id NOT IN (SELECT kpi_id FROM kpi_latest)",
+    "versions": """created_at < ? AND EXISTS (SELECT 1 FROM versions v2
+                   WHERE v2.report_id = versions.report_id AND v2.version_no > versions.version_no)""",
+}
+
+
+def read_uri(path):
+    return Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+
+
+@contextmanager
+def attached(c, path, write=False, enabled=True):
+    """ATTACH path as "archive" for the block and yield True. Nothing is attached and
+    False is yielded when enabled is false, or when reading and the archive does not
+    exist yet. The block's transaction is committed on success and rolled back on error.
+    Must be called outside a transaction."""
+    if not enabled or (not write and not os.path.exists(path)):
+        yield False
+        return
+    c.execute("ATTACH DATABASE ? AS archive", (path if write else read_uri(path),))
+    try:
+        yield True
+    except BaseException:
+        if c.in_transaction:
+            c.rollback()
+        raise
+    else:
+        if c.in_transaction:
+            c.commit()
+    finally:
+        c.execute("DETACH DATABASE archive")
+
+
+def history_sql(table, archived):
+    """FROM-able source for kpis or versions: the hot table, or both files when archived is true.
+
+    A transaction spanning two WAL databases is only atomic per file, so a crash
+    while archive_old() commits can leave a row in both until the next run; the
+    hot copy wins.
+    """
+    if not archived:
+        return table
+    return f"""(SELECT * FROM main.{table} UNION ALL SELECT * FROM archive.{table} a
+               WHERE NOT EXISTS (SELECT 1 FROM main.{table} m WHERE m.id = a.id))"""
+
+
+def archive_old(c, path, weeks, now=None):
+    """Move snapshots/versions older than `weeks` weeks into the archive at path; returns counts."""
+    cutoff = ((now or datetime.now()) - timedelta(weeks=weeks)).strftime("%Y-%m-%d %H:%M:%S")
+    summary = {"cutoff": cutoff}
+    with attached(c, path, write=True):
+        for table, cols in ARCHIVE_SCHEMA.items():
+            c.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} {cols}")
+        for name, target in ARCHIVE_INDEXES.items():
+            c.execute(f"CREATE INDEX IF NOT EXISTS archive.{name} ON {target}")
+        for table, where in _MOVABLE.items():
+            same = " AND ".join(f"a.{col} IS main.{table}.{col}" for col in ARCHIVE_COLUMNS[table])
+            conflicts = c.execute(f"""SELECT COUNT(*) FROM main.{table} WHERE {where} AND EXISTS
+                                      (SELECT 1 FROM archive.{table} a WHERE a.id = main.{table}.id AND NOT ({same}))""",
+                                  (cutoff,)).fetchone()[0]
+            if conflicts:
+                raise ValueError(f"{conflicts} {table} id(s) are already archived in {path} with different "
+                                 "content (was the database reset?); move that archive aside and retry")
+            c.execute(f"INSERT OR IGNORE INTO archive.{table} SELECT * FROM main.{table} WHERE {where}", (cutoff,))
+            # Only rows whose archive copy is identical leave the hot table.
+            summary[table] = c.execute(f"""DELETE FROM main.{table} WHERE {where} AND EXISTS
+                                           (SELECT 1 FROM archive.{table} a WHERE a.id = main.{table}.id AND {same})""",
+                                       (cutoff,)).rowcount
+        c.commit()
+    return summary
+
+
+def compact(c, path):
+    """VACUUM the hot database, truncate its WAL and refresh planner statistics.
+
+    reports has no INTEGER PRIMARY KEY, so VACUUM may renumber its rowids and
+    the external-content reports_fts index is rebuilt afterwards.
+    """
+    if c.in_transaction:
+        c.commit()
+    c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    before = os.path.getsize(path)
+    c.execute("VACUUM")
+    if c.execute("SELECT 1 FROM sqlite_master WHERE name='reports_fts'").fetchone():
+        c.execute("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')")
+        c.commit()
+    c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    c.execute("PRAGMA optimize")
+    return {"bytes_before": before, "bytes_after": os.path.getsize(path)}
@@ -0,0 +1,455 @@
+"""Requests-per-second benchmark for the hub routes.
+
+Runs against a throwaway, freshly seeded database through Flask's test client:
+
+    python bench.py                  # /dashboard and /api/kpis, 1000 requests each
+    python bench.py -n 2000 /api/kpis
+    python bench.py --decks 500      # PPT: per-report loop vs bulk combined / zip
+    python bench.py --ingest 100000  # KPI snapshots: /add_kpi form posts vs /api/kpis/bulk
+
+The suite measures p50/p99 latency and throughput of the main routes through the
+test client and a local WSGI server, and writes JSON for release-to-release comparison:
+
+    python bench.py --suite --reports 100000 --kpis 1000000 --json results.json
+    python bench.py --suite --db big.db -c 4 --json new.json --compare results.json
+    python bench.py --startup 20 --json startup.json --compare startup-baseline.json
+
+The default run compares "per-request init", the pre-migrations bootstrap (a new
+connection, five CREATE TABLE IF NOT EXISTS statements and three seed-check
+COUNTs) run before every request as every route used to, with the startup
+bootstrap. The response and fragment caches are off for both columns so each
+request reaches the database.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from jinja2 import FileSystemLoader
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import app as hub
+import decks
+import loadgen
+
+DEFAULT_ROUTES = ["/dashboard", "/api/kpis"]
+
+
+def use_flat_templates():
+    # Flat checkout: the templates sit next to app.py instead of templates/.
+    if not os.path.isdir(os.path.join(hub.APP_DIR, "templates")):
+        hub.app.jinja_loader = FileSystemLoader(hub.APP_DIR)
+
+
+def setup(db_path):
+    hub.DB_PATH = db_path
+    use_flat_templates()
+    return hub.create_app().test_client()
+
+
+def rps(client, route, n):
+    client.get(route)  # warm up
+    t0 = time.perf_counter()
+    for _ in range(n):
+        r = client.get(route)
+        if r.status_code != 200:
+            raise SystemExit(f"{route} returned {r.status_code}")
+    return n / (time.perf_counter() - t0)
+
+
+def legacy_init():
+    """The per-request bootstrap routes ran before the schema moved to startup, on its own connection."""
+    c = sqlite3.connect(hub.DB_PATH)
+    try:
+        c.row_factory = sqlite3.Row
+        hub._migrate_v1(c)
+        for table in ("departments", "kpi_master", "reports"):
+            c.execute(f"SELECT COUNT(*) AS n FROM {table}").fetchone()
+        c.commit()
+    finally:
+        c.close()
+
+
+def run(routes, n):
+    results = {}
+    sizes = hub.response_cache.maxsize, hub.fragment_cache.maxsize
+    hub.response_cache.maxsize = hub.fragment_cache.maxsize = 0
+    try:
+        for route in routes:
+            client = hub.app.test_client()
+            after = rps(client, route, n)
+            hub.app.before_request_funcs.setdefault(None, []).append(legacy_init)
+            try:
+                before = rps(client, route, n)
+            finally:
+                hub.app.before_request_funcs[None].remove(legacy_init)
+            results[route] = (before, after)
+    finally:
+        hub.response_cache.maxsize, hub.fragment_cache.maxsize = sizes
+    return results
+
+
+def _wait(job):
+    while job["status"] == "running":
+        time.sleep(0.05)
+        job = hub.deck_jobs.get(job["id"])
+    if job["status"] != "done":
+        raise SystemExit(f"deck job failed: {job['error']}")
+    return job
+
+
+def run_decks(n, workers):
+    """Render n reports of one week: one-at-a-time (3 queries + render each) vs the bulk jobs."""
+    week = "W99"
+    with hub.conn() as c:
+        loadgen.fill(c, reports=n, kpis=n * 3, versions=n * 2, prefix="B", project="Bench", week=week)
+    hub.deck_jobs = decks.DeckJobs(workers=workers, max_pending=10)
+    results = {}
+
+    t0 = time.perf_counter()
+    with hub.conn() as c:
+        ids = [r["report_id"] for r in c.execute("SELECT report_id FROM reports WHERE week=?", (week,))]
+    for rid in ids:
+        with hub.conn() as c:
+            deck = hub.load_deck(c, rid)
+        prs = decks.new_presentation()
+        decks.add_report_slides(prs, deck)
+        prs.save(os.path.join(hub.PPT_DIR, f"seq_{rid}.pptx"))
+    results["sequential per-report"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with hub.conn() as c:
+        batch = hub.load_decks(c, week=week)
+    results["batched fetch only"] = time.perf_counter() - t0
+
+    for mode in ("combined", "zip"):
+        t0 = time.perf_counter()
+        _wait(hub._submit_bulk(week, "", mode))
+        results[f"bulk {mode}"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    _wait(hub._submit_bulk(week, "", "zip"))
+    results["bulk zip (cached)"] = time.perf_counter() - t0
+    hub.deck_jobs.shutdown()
+
+    print(f"{len(batch)} reports, {workers} workers")
+    for name, secs in results.items():
+        print(f"{name:<24}{secs:>8.2f} s")
+
+
+def run_ingest(n):
+    """Insert n KPI snapshots through /api/kpis/bulk; time a sample of per-row /add_kpi posts for comparison."""
+    with hub.conn() as c:
+        ids = loadgen.fill(c, reports=1000, kpis=0, versions=0, prefix="I")
+    rows = [{"report_id": ids[i % len(ids)], "sla": 99.5, "p1_incidents": i % 3, "mttr_minutes": 30,
+             "risk_count": i % 5, "rag": loadgen.RAGS[i % 3]} for i in range(n)]
+    body = "\n".join(json.dumps(r) for r in rows).encode("utf-8")
+    client = hub.app.test_client()
+
+    sample = min(n, 1000)
+    t0 = time.perf_counter()
+    for row in rows[:sample]:
+        client.post(f"/add_kpi/{row['report_id']}", data={k: v for k, v in row.items() if k != "report_id"})
+    per_row = sample / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    r = client.post("/api/kpis/bulk", data=body, content_type="application/x-ndjson")
+    bulk = n / (time.perf_counter() - t0)
+    if r.status_code != 200 or r.json["inserted"] != n:
+        raise SystemExit(f"bulk ingest failed: {r.status_code} {r.json}")
+
+    print(f"{'/add_kpi (per row)':<24}{per_row:>10.0f} rows/s  ({sample} rows)")
+    print(f"{'/api/kpis/bulk':<24}{bulk:>10.0f} rows/s  ({n} rows){bulk / per_row:>8.1f}x")
+
+
+# (name, method, path, requests or None for -n). PPT posts a deck job per report and
+# waits for it, so its latency is enqueue-to-done.
+SUITE = [
+    ("dashboard", "GET", "/dashboard", None),
+    ("dashboard project", "GET", "/dashboard?project=Alpha", None),
+    ("dashboard week", "GET", "/dashboard?week=W10", None),
+    ("dashboard owner+type", "GET", "/dashboard?owner=GPSE3&report_type=Weekly", None),
+    ("dashboard search", "GET", "/dashboard?q=gpse1", None),
+    ("api/kpis page", "GET", "/api/kpis?limit=1000", None),
+    ("api/kpis full", "GET", "/api/kpis", 5),
+    ("api/kpi_trends", "GET", "/api/kpi_trends?by=project,week", None),
+    ("export kpis.csv", "GET", "/export/kpis.csv", 3),
+    ("assistant search", "GET", "/assistant?q=sla", None),
+    ("generate_ppt", "PPT", "/api/reports/{}/ppt", 20),
+]
+SUITE_N = 200
+
+
+class ClientTransport:
+    name = "test_client"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path):
+        client = getattr(self._local, "client", None) or hub.app.test_client()
+        self._local.client = client
+        r = client.open(path, method=method)
+        return r.status_code, r.get_data()
+
+    def close(self):
+        pass
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args):
+        pass
+
+
+class WSGITransport:
+    """The app behind werkzeug's threaded WSGI server on an ephemeral local port."""
+    name = "wsgi"
+
+    def __init__(self):
+        self.server = make_server("127.0.0.1", 0, hub.app, threaded=True, request_handler=_QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def request(self, method, path):
+        c = http.client.HTTPConnection("127.0.0.1", self.server.server_port, timeout=600)
+        try:
+            c.request(method, path)
+            r = c.getresponse()
+            return r.status, r.read()
+        finally:
+            c.close()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, max(0, -(-p * len(sorted_values) // 100) - 1))]
+
+
+def _ppt_roundtrip(transport, path):
+    status, body = transport.request("POST", path)
+    job = json.loads(body)
+    while status in (200, 202) and job["status"] in ("queued", "running"):
+        time.sleep(0.01)
+        status, body = transport.request("GET", f"/api/ppt_jobs/{job['id']}")
+        job = json.loads(body)
+    return 200 if job.get("status") == "done" else 500, body
+
+
+def measure(transport, method, path, n, concurrency, report_ids):
+    if method == "PPT":
+        hub.PPT_DIR = tempfile.mkdtemp(prefix="ppt-", dir=os.path.dirname(hub.PPT_DIR))
+        call = lambda i: _ppt_roundtrip(transport, path.format(report_ids[i % len(report_ids)]))
+    else:
+        transport.request(method, path)  # warm up
+        call = lambda i: transport.request(method, path)
+
+    def timed(i):
+        t0 = time.perf_counter()
+        status, _ = call(i)
+        return time.perf_counter() - t0, status
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        done = list(ex.map(timed, range(n)))
+    wall = time.perf_counter() - t0
+    return _summary([d for d, _ in done], wall, sum(1 for _, s in done if s >= 400), concurrency)
+
+
+def _summary(latencies, wall, errors, concurrency):
+    lat, n = sorted(latencies), len(latencies)
+    return {"n": n, "concurrency": concurrency, "errors": errors,
+            "rps": round(n / wall, 2), "mean_ms": round(1000 * sum(lat) / n, 3),
+            "p50_ms": round(1000 * percentile(lat, 50), 3), "p90_ms": round(1000 * percentile(lat, 90), 3),
+            "p99_ms": round(1000 * percentile(lat, 99), 3), "max_ms": round(1000 * lat[-1], 3)}
+
+
+def _meta(args):
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=hub.APP_DIR, capture_output=True,
+                             text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        rev = None
+    with hub.conn() as c:
+        scale = {t: c.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                 for t in ("reports", "versions", "kpis", "kpi_master")}
+    return {"at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "git": rev, "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version, "platform": platform.platform(), "cpus": os.cpu_count(),
+            "response_cache": not args.no_cache, "profiling": hub.app.config["PROFILING"], "scale": scale}
+
+
+def run_suite(args):
+    if args.db:
+        hub.DB_PATH = args.db
+        hub.init_db()
+    else:
+        with hub.conn() as c:
+            loadgen.fill(c, args.reports, args.kpis, args.versions)
+            loadgen.fill_kpi_library(c, args.kpi_master)
+    if args.no_cache:
+        hub.response_cache.maxsize = 0
+        hub.fragment_cache.maxsize = 0
+    hub.deck_jobs = decks.DeckJobs(workers=args.workers, max_pending=max(100, args.concurrency * 4))
+    with hub.conn() as c:
+        report_ids = [r[0] for r in c.execute("SELECT report_id FROM reports ORDER BY report_id LIMIT 1000")]
+
+    only = [s.lower() for s in args.routes] if args.routes != DEFAULT_ROUTES else []
+    results = []
+    for transport_cls in ([ClientTransport, WSGITransport] if args.transport == "both"
+                          else [ClientTransport if args.transport == "client" else WSGITransport]):
+        transport = transport_cls()
+        try:
+            for name, method, path, n in SUITE:
+                if only and not any(o in name for o in only):
+                    continue
+                r = measure(transport, method, path, n or args.n or SUITE_N, args.concurrency, report_ids)
+                results.append({"scenario": name, "transport": transport.name, "method": method, "path": path, **r})
+                print(f"{transport.name:<12}{name:<24}{r['rps']:>9.1f} r/s  p50 {r['p50_ms']:>9.2f} ms"
+                      f"  p99 {r['p99_ms']:>9.2f} ms{'  errors ' + str(r['errors']) if r['errors'] else ''}")
+        finally:
+            transport.close()
+    hub.deck_jobs.shutdown()
+    return {"meta": _meta(args), "results": results}
+
+
+# Cold start in a fresh interpreter: import app, create_app() (migration check on
+# an existing database), then the first request. Prints the three phases in seconds.
+STARTUP_SCRIPT = """
+import sys, time
+t0 = time.perf_counter()
+import app as hub
+t1 = time.perf_counter()
+hub.DB_PATH = sys.argv[1]
+client = hub.create_app().test_client()
+t2 = time.perf_counter()
+status = client.get("/api/departments").status_code
+print(t1 - t0, t2 - t1, time.perf_counter() - t2, status)
+"""
+STARTUP_PHASES = ("startup import", "startup create_app", "startup first request")
+
+
+def _importtime():
+    """(module, cumulative microseconds) for `import app` under -X importtime, slowest first."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=hub.APP_DIR,
+                         capture_output=True, text=True, check=True).stderr
+    mods = []
+    for line in err.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            mods.append((parts[2].strip(), int(parts[1])))
+    return sorted(mods, key=lambda m: -m[1])
+
+
+def run_startup(n):
+    """Time n fresh processes through STARTUP_SCRIPT; one result per phase plus the total."""
+    cmd = [sys.executable, "-c", STARTUP_SCRIPT, hub.DB_PATH]
+    subprocess.run(cmd, cwd=hub.APP_DIR, capture_output=True, check=True)  # warm the OS file cache and .pyc files
+    phases, errors = {name: [] for name in STARTUP_PHASES + ("startup total",)}, 0
+    for _ in range(n):
+        out = subprocess.run(cmd, cwd=hub.APP_DIR, capture_output=True, text=True, check=True).stdout.split()
+        secs = [float(x) for x in out[:3]]
+        errors += out[3] != "200"
+        for name, s in zip(STARTUP_PHASES, secs):
+            phases[name].append(s)
+        phases["startup total"].append(sum(secs))
+    results = []
+    for name, lat in phases.items():
+        r = _summary(lat, sum(lat), errors, 1)
+        results.append({"scenario": name, "transport": "process", "method": "-", "path": "python -c 'import app'", **r})
+        print(f"{'process':<12}{name:<24}{'':>15}p50 {r['p50_ms']:>9.2f} ms  p99 {r['p99_ms']:>9.2f} ms")
+    print("\nslowest imports (cumulative, -X importtime):")
+    for mod, us in _importtime()[:10]:
+        print(f"  {us / 1000:>8.1f} ms  {mod}")
+    return results
+
+
+def compare(report, baseline_path, threshold):
+    """Print p50/rps ratios against a previous run; returns the number of p50 regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {(r["scenario"], r["transport"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\n{'vs ' + baseline_path:<36}{'p50':>10}{'p99':>10}{'rps':>10}")
+    for r in report["results"]:
+        b = base.get((r["scenario"], r["transport"], r["concurrency"]))
+        if not b:
+            continue
+        p50 = r["p50_ms"] / b["p50_ms"] if b["p50_ms"] else 1.0
+        slower = p50 > 1 + threshold
+        regressions += slower
+        print(f"{r['transport'] + ' ' + r['scenario']:<36}{p50:>9.2f}x"
+              f"{r['p99_ms'] / b['p99_ms'] if b['p99_ms'] else 1.0:>9.2f}x"
+              f"{r['rps'] / b['rps'] if b['rps'] else 1.0:>9.2f}x{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("routes", nargs="*", default=DEFAULT_ROUTES)
+    ap.add_argument("-n", type=int, help="requests per route and mode (default 1000; suite: 200)")
+    ap.add_argument("--decks", type=int, metavar="N", help="benchmark PPT generation for N reports instead")
+    ap.add_argument("--ingest", type=int, metavar="N", help="benchmark bulk KPI ingestion of N rows instead")
+    ap.add_argument("--startup", type=int, metavar="N",
+                    help="time cold start (import, create_app, first request) over N fresh processes; "
+                         "combines with --suite, --json and --compare")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="deck worker processes")
+    suite = ap.add_argument_group("suite", "latency/throughput suite (positional routes filter scenarios by name)")
+    suite.add_argument("--suite", action="store_true", help="run the SUITE scenarios")
+    suite.add_argument("--db", help="benchmark an existing database (e.g. from loadgen.py) instead of seeding one")
+    suite.add_argument("--reports", type=int, default=10000)
+    suite.add_argument("--kpis", type=int, default=100000)
+    suite.add_argument("--versions", type=int, default=20000)
+    suite.add_argument("--kpi-master", type=int, default=1000)
+    suite.add_argument("--transport", choices=("client", "wsgi", "both"), default="both")
+    suite.add_argument("-c", "--concurrency", type=int, default=1, help="parallel requests")
+    suite.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    suite.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    suite.add_argument("--compare", metavar="PATH", help="compare with an earlier --json result")
+    suite.add_argument("--threshold", type=float, default=0.2, help="p50 slowdown counted as a regression")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="gpse-bench-")
+    try:
+        setup(os.path.join(tmp, "bench.db"))
+        hub.PPT_DIR = os.path.join(tmp, "ppt")
+        os.makedirs(hub.PPT_DIR)
+        if args.decks:
+            return run_decks(args.decks, args.workers)
+        if args.ingest:
+            return run_ingest(args.ingest)
+        if args.suite or args.startup:
+            report = run_suite(args) if args.suite else {"meta": _meta(args), "results": []}
+            if args.startup:
+                report["results"] += run_startup(args.startup)
+        else:
+            results = run(args.routes, args.n or 1000)
+    finally:
+        hub.close_pool()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.suite or args.startup:
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+        elif args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        if args.compare and compare(report, args.compare, args.threshold):
+            sys.exit(1)
+        return
+
+    print(f"{'route':<20}{'per-request init':>18}{'startup init':>14}{'speedup':>9}")
+    for route, (before, after) in results.items():
+        print(f"{route:<20}{before:>14.0f} r/s{after:>10.0f} r/s{after / before:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
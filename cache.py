@@ -0,0 +1,111 @@
+"""In-process LRU cache with per-entry TTL and a total size bound.
+
+Used for read-only API responses and dashboard lookups. Writers call
+invalidate(), which drops every entry and moves last_modified forward.
+
+FragmentCache holds rendered HTML fragments instead. It is not invalidated by
+writes: each fragment records the data generation and version it was rendered
+for, and is re-checked when the generation moves on.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class LRUCache:
+    def __init__(self, maxsize=256, ttl=60.0, max_bytes=32 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    self._drop(key)
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return item[2]
+
+    def set(self, key, value, size=1, ttl=None, generation=None):
+        """Store value; skipped if it is bigger than the whole cache or the data changed meanwhile."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), size, value)
+            self._bytes += size
+            while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.stats["evictions"] += 1
+
+    def memoize(self, key, fn, ttl=None):
+        value = self.get(key)
+        if value is None:
+            generation = self.generation
+            value = fn()
+            self.set(key, value, ttl=ttl, generation=generation)
+        return value
+
+    def _drop(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.generation += 1
+            self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            self.stats["invalidations"] += 1
+
+    def info(self):
+        with self._lock:
+            return {**self.stats, "entries": len(self._data), "bytes": self._bytes,
+                    "generation": self.generation, "last_modified": self.last_modified.isoformat()}
+
+
+class FragmentCache(LRUCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats.update(revalidated=0, renders=0)
+
+    def fragment(self, key, generation, version, render):
+        """HTML for key, rendered by render(v) only when needed.
+
+        A cached fragment is served as is while generation (the caller's data
+        generation, read before anything else) is the one it was stored under.
+        After that, version() (e.g. a row's updated_at) decides: the same version
+        keeps the fragment, anything else re-renders. With version=None a new
+        generation always re-renders. render may return None (nothing to show,
+        not cached).
+        """
+        entry = self.get(key)  # (generation, version, html)
+        if entry is not None and entry[0] == generation:
+            return entry[2]
+        v = version() if version else None
+        if entry is not None and version and entry[1] == v:
+            html = entry[2]
+            with self._lock:
+                self.stats["revalidated"] += 1
+        else:
+            html = render(v)
+            if html is None:
+                return None
+            with self._lock:
+                self.stats["renders"] += 1
+        self.set(key, (generation, v, html), size=len(html))
+        return html
@@ -0,0 +1,61 @@
+"""Append-only change log behind /api/changes and its Server-Sent Events stream.
+
+Writers add rows to change_log inside their own transaction (log_change) and
+call ChangeNotifier.notify() once it has committed, which wakes this process's
+streams straight away; streams also re-poll every few seconds so writes made by
+other worker processes reach them too. Only the newest KEEP entries are kept.
+
+Sequence numbers only grow within one database file. After /admin/reset-demo,
+or when a client asks for entries that were already trimmed, changes_since()
+reports a reset and the client should reload in full.
+"""
+import json
+import threading
+
+KEEP = 10000
+
+
+def log_change(c, kind, report_id, payload, ts):
+    seq = c.execute("INSERT INTO change_log(kind, report_id, payload, created_at) VALUES(?,?,?,?)",
+                    (kind, report_id, json.dumps(payload, default=str), ts)).lastrowid
+    if seq > KEEP:
+        c.execute("DELETE FROM change_log WHERE seq <= ?", (seq - KEEP,))
+    return seq
+
+
+def last_seq(c):
+    return c.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+
+def changes_since(c, since, limit):
+    """(entries after since as dicts, reset flag, newest seq)."""
+    lo, hi = c.execute("""SELECT (SELECT MIN(seq) FROM change_log),
+                                 (SELECT COALESCE(MAX(seq), 0) FROM change_log)""").fetchone()
+    if since > hi or (since and lo is not None and since < lo - 1):
+        return [], True, hi
+    rows = c.execute("""SELECT seq, kind, report_id, payload, created_at FROM change_log
+                        WHERE seq > ? ORDER BY seq LIMIT ?""", (since, limit)).fetchall()
+    return [{**dict(r), "payload": json.loads(r["payload"])} for r in rows], False, hi
+
+
+def sse_event(seq, event, data):
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class ChangeNotifier:
+    """Wakes waiting streams in this process when a write commits."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.version = 0
+
+    def notify(self):
+        with self._cond:
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait(self, version, timeout):
+        """Block until notify() moves past version or timeout passes; returns the current version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
@@ -0,0 +1,183 @@
+"""Thread-safe SQLite connection pool used by app.conn().
+
+Connections are opened lazily up to ``size``, reused LIFO so the warmest page
+cache is handed out first, and configured once with the pool's pragmas (WAL
+journaling by default). Statements that hit SQLITE_BUSY after the busy timeout
+are retried with a short backoff; waits and retries are counted in stats().
+"""
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -16000,       # KiB, i.e. ~16 MB per connection
+    "mmap_size": 268435456,     # 256 MB
+    "temp_store": "MEMORY",
+}
+
+
+def _is_locked(exc):
+    msg = str(exc).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection that retries statements failing with SQLITE_BUSY."""
+
+    pool = None
+
+    def _retry(self, fn, *args):
+        attempt = 0
+        while True:
+            try:
+                return fn(*args)
+            except sqlite3.OperationalError as e:
+                if not _is_locked(e) or attempt >= self.pool.lock_retries:
+                    if _is_locked(e):
+                        self.pool._count("lock_failures")
+                    raise
+                attempt += 1
+                self.pool._count("lock_retries")
+                time.sleep(self.pool.retry_delay * attempt)
+
+    def _run(self, fn, sql, *args):
+        if not self.pool.on_statement:
+            return self._retry(fn, sql, *args)
+        t0 = time.perf_counter()
+        try:
+            return self._retry(fn, sql, *args)
+        finally:
+            dt = time.perf_counter() - t0
+            for hook in self.pool.on_statement:
+                hook(sql, dt)
+
+    def execute(self, *args):
+        return self._run(super().execute, *args)
+
+    def executemany(self, *args):
+        return self._run(super().executemany, *args)
+
+    def executescript(self, *args):
+        return self._run(super().executescript, *args)
+
+    def commit(self):
+        return self._retry(super().commit)
+
+
+class ConnectionPool:
+    def __init__(self, path, size=8, pragmas=None, timeout=30.0, cached_statements=256,
+                 lock_retries=5, retry_delay=0.05, uri=False, on_connect=(), on_statement=(), on_checkout=()):
+        self.path = path
+        self.size = size
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.lock_retries = lock_retries
+        self.retry_delay = retry_delay
+        self.uri = uri
+        self.on_connect = list(on_connect)
+        self.on_statement = list(on_statement)  # hook(sql, seconds) after execute*(): prepare + first step
+        self.on_checkout = list(on_checkout)    # hook(seconds) waiting for / opening a connection
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+        self._stats = {"checkouts": 0, "checkout_wait_s": 0.0, "checkout_wait_max_s": 0.0,
+                       "lock_retries": 0, "lock_failures": 0, "opened": 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _open(self):
+        c = sqlite3.connect(self.path, timeout=self.pragmas.get("busy_timeout", 5000) / 1000,
+                            check_same_thread=False, cached_statements=self.cached_statements,
+                            uri=self.uri, factory=PooledConnection)
+        c.pool = self
+        c.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            c.execute(f"PRAGMA {name}={value}")
+        for hook in self.on_connect:
+            hook(c)
+        return c
+
+    def _checkout(self):
+        t0 = time.perf_counter()
+        try:
+            c = self._idle.get_nowait()
+        except queue.Empty:
+            c = None
+            with self._lock:
+                if self._opened < self.size:
+                    self._opened += 1
+                    self._stats["opened"] += 1
+                    grow = True
+                else:
+                    grow = False
+            if grow:
+                try:
+                    c = self._open()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                try:
+                    c = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"no pooled connection available after {self.timeout}s") from None
+        waited = time.perf_counter() - t0
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["checkout_wait_s"] += waited
+            self._stats["checkout_wait_max_s"] = max(self._stats["checkout_wait_max_s"], waited)
+        for hook in self.on_checkout:
+            hook(waited)
+        return c
+
+    def _checkin(self, c):
+        if c.in_transaction:
+            c.rollback()
+        if self._closed:
+            c.close()
+            with self._lock:
+                self._opened -= 1
+        else:
+            self._idle.put(c)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; commit on success, roll back on error."""
+        c = self._checkout()
+        try:
+            yield c
+            c.commit()
+        except BaseException:
+            c.rollback()
+            raise
+        finally:
+            self._checkin(c)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["size"] = self.size
+            out["open"] = self._opened
+        out["idle"] = self._idle.qsize()
+        return out
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                c = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            c.close()
+            with self._lock:
+                self._opened -= 1
@@ -0,0 +1,295 @@
+"""PowerPoint deck rendering and the background job queue that runs it.
+
+Rendering functions take plain dicts (report, latest kpi, versions) so they can
+run in worker processes without touching the database. DeckJobs hands renders
+to a bounded process pool and reuses an existing .pptx whenever the cache key
+(report fields + latest kpi id + version ids) is unchanged.
+
+A job's id is its artifact's file name. While it runs a "<file>.job" marker sits
+next to the artifact and a failure leaves "<file>.error", so another worker
+process serving the same output directory can answer status and download
+requests for jobs it did not start.
+"""
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+# python-pptx (and lxml behind it) is imported by the render functions on first
+# use, so importing this module, and the app, stays cheap.
+PPTX_MODULES = ("pptx", "lxml")
+
+
+@lru_cache(maxsize=None)
+def pptx_available():
+    """True if python-pptx and lxml are installed; found on the import path without importing them."""
+    return all(importlib.util.find_spec(m) is not None for m in PPTX_MODULES)
+
+
+def _ppt_add_bullets(slide, title, bullets):
+    from pptx.util import Pt
+    slide.shapes.title.text = title
+    tf = slide.shapes.placeholders[1].text_frame
+    tf.clear()
+    for i, b in enumerate(bullets):
+        p = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
+        p.text = b
+        p.level = 0
+        p.font.size = Pt(18)
+
+
+def add_report_slides(prs, deck):
+    report, kpi, versions = deck["report"], deck["kpi"], deck["versions"]
+    s0 = prs.slides.add_slide(prs.slide_layouts[0])
+    s0.shapes.title.text = f"{report['project']} — {report['week']} ({report['report_type']})"
+    s0.placeholders[1].text = (f"Report ID: {report['report_id']} | Owner: {report['owner']} | Status: {report['status']}"
+                               f"\nGenerated: {deck['generated']}")
+
+    s1 = prs.slides.add_slide(prs.slide_layouts[1])
+    bullets = [f"SLA: {kpi['sla']}%", f"P1 Incidents: {kpi['p1_incidents']}", f"MTTR: {kpi['mttr_minutes']} min",
+               f"Risk Count: {kpi['risk_count']}", f"RAG Status: {kpi['rag']}"] if kpi else ["No KPI snapshot found yet."]
+    _ppt_add_bullets(s1, "KPIs (Latest Snapshot)", bullets)
+
+    s2 = prs.slides.add_slide(prs.slide_layouts[1])
+    bullets = [f"v{v['version_no']}: {v['notes']}" for v in versions] if versions else ["No versions recorded yet."]
+    _ppt_add_bullets(s2, "Recent Versions / Notes", bullets)
+
+
+def new_presentation():
+    from pptx import Presentation
+    return Presentation()
+
+
+def render_deck(deck, out_path):
+    prs = new_presentation()
+    add_report_slides(prs, deck)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    prs.save(tmp)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def render_combined(decks, title, subtitle, out_path):
+    """One presentation: a cover slide, then the three report slides for each deck."""
+    prs = new_presentation()
+    cover = prs.slides.add_slide(prs.slide_layouts[0])
+    cover.shapes.title.text = title
+    cover.placeholders[1].text = subtitle
+    for deck in decks:
+        add_report_slides(prs, deck)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    prs.save(tmp)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def write_zip(paths, out_path):
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as z:  # .pptx is already deflated
+        for path in paths:
+            z.write(path, os.path.basename(path))
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def deck_key(deck):
+    r, kpi = deck["report"], deck["kpi"]
+    parts = [r["report_id"], r["project"], r["week"], r["owner"], r["report_type"], r["status"],
+             kpi["id"] if kpi else "-", ",".join(str(v["id"]) for v in deck["versions"])]
+    return hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:12]
+
+
+def deck_filename(deck):
+    r = deck["report"]
+    return f"{r['report_id']}_{r['project']}_{r['week']}_{deck_key(deck)}.pptx".replace(" ", "_")
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _public(job):
+    return {k: v for k, v in job.items() if not k.startswith("_")}
+
+
+class DeckJobs:
+    """Job registry in front of a lazily started ProcessPoolExecutor."""
+
+    def __init__(self, workers=2, max_pending=100, keep=1000, on_finish=()):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep = keep
+        self._executor = None
+        self._threads = None
+        self._jobs = {}
+        self._by_path = {}  # artifact path -> job id still queued/running
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self.on_finish = list(on_finish)  # hook(job) once a queued job is done or failed
+
+    def _pool(self):
+        with self._init_lock:
+            if self._executor is None:
+                # Not fork: the app's worker processes run several threads, and a child
+                # forked while one of them holds a lock (sqlite, logging) can deadlock.
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _coordinator(self):
+        with self._init_lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=2, thread_name_prefix="deck-bulk")
+            return self._threads
+
+    def _new_job(self, kind, path, status, **extra):
+        job = {"id": os.path.basename(path), "kind": kind, "status": status, "_path": path,
+               "file": os.path.basename(path), "error": None, "cached": False,
+               "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "finished": None, **extra}
+        self._jobs.pop(job["id"], None)
+        self._jobs[job["id"]] = job
+        while len(self._jobs) > self.keep:
+            oldest = next(iter(self._jobs))
+            if self._jobs[oldest]["status"] in ("queued", "running"):
+                break
+            del self._jobs[oldest]
+        return job
+
+    def submit(self, kind, path, fn, *args, **extra):
+        """Run fn(*args) in the pool unless path already exists or is being built.
+
+        With fn=None, args[0] is a callable run on a coordinator thread instead
+        (for jobs that fan work out to the pool themselves).
+        """
+        with self._lock:
+            if os.path.exists(path):
+                job = self._new_job(kind, path, "done", **extra)
+                job["cached"] = True
+                job["finished"] = job["created"]
+                return _public(job)
+            running = self._by_path.get(path)
+            if running:
+                return _public(self._jobs[running])
+            pending = sum(1 for j in self._jobs.values() if j["status"] in ("queued", "running"))
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} deck jobs already pending")
+            job = self._new_job(kind, path, "queued", **extra)
+            self._by_path[path] = job["id"]
+            job["_t0"] = time.perf_counter()
+            try:
+                if os.path.exists(path + ".error"):
+                    os.remove(path + ".error")
+                open(path + ".job", "w").close()
+                if fn is None:
+                    future = self._coordinator().submit(*args)
+                else:
+                    future = self._pool().submit(fn, *args)
+            except Exception as e:
+                self._by_path.pop(path, None)
+                self._clear_marker(path)
+                job.update(status="failed", error=repr(e))
+                return _public(job)
+            job["status"] = "running"
+        future.add_done_callback(lambda f, job_id=job["id"]: self._finish(job_id, f))
+        return self.get(job["id"])
+
+    def submit_deck(self, deck, out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, deck_filename(deck))
+        return self.submit("report", path, render_deck, deck, path, report_id=deck["report"]["report_id"])
+
+    def submit_bulk(self, decks, out_dir, name, mode="combined", title="", subtitle=""):
+        """One job for many reports: a combined .pptx or a .zip of per-report decks.
+
+        Zip mode renders the missing per-report decks in parallel across the pool
+        (reusing cached ones) and then zips them. A combined deck is a single
+        presentation, so it is rendered by one worker.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        key = hashlib.sha1(f"{mode}|{title}|".encode("utf-8")
+                           + ",".join(deck_key(d) for d in decks).encode("utf-8")).hexdigest()[:12]
+        path = os.path.join(out_dir, f"{name}_{key}.{'zip' if mode == 'zip' else 'pptx'}".replace(" ", "_"))
+        if mode == "zip":
+            return self.submit("bulk_zip", path, None, self._build_zip, decks, out_dir, path, reports=len(decks))
+        return self.submit("bulk_combined", path, render_combined, decks, title, subtitle, path, reports=len(decks))
+
+    def _build_zip(self, decks, out_dir, path):
+        paths = [os.path.join(out_dir, deck_filename(d)) for d in decks]
+        todo = [(d, p) for d, p in zip(decks, paths) if not os.path.exists(p)]
+        if todo:
+            chunksize = max(1, len(todo) // (self.workers * 4))
+            list(self._pool().map(render_deck, *zip(*todo), chunksize=chunksize))
+        return write_zip(paths, path)
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            self._by_path.pop(job["_path"], None)
+            exc = future.exception()
+            job["status"] = "failed" if exc else "done"
+            job["error"] = repr(exc) if exc else None
+            job["finished"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            job["seconds"] = round(time.perf_counter() - job.pop("_t0"), 3)
+            public = _public(job)
+            if exc:
+                with open(job["_path"] + ".error", "w", encoding="utf-8") as f:
+                    f.write(job["error"])
+            self._clear_marker(job["_path"])
+        for hook in self.on_finish:
+            hook(public)
+
+    @staticmethod
+    def _clear_marker(path):
+        try:
+            os.remove(path + ".job")
+        except OSError:
+            pass
+
+    def _from_disk(self, job_id, out_dir):
+        """Job started by another process, reconstructed from the files in out_dir."""
+        if not out_dir or job_id != os.path.basename(job_id) or job_id.startswith("."):
+            return None
+        path = os.path.join(out_dir, job_id)
+        job = {"id": job_id, "kind": None, "file": job_id, "error": None, "cached": False,
+               "created": None, "finished": None, "_path": path}
+        if os.path.exists(path):
+            job["status"] = "done"
+        elif os.path.exists(path + ".error"):
+            with open(path + ".error", encoding="utf-8") as f:
+                job.update(status="failed", error=f.read())
+        elif os.path.exists(path + ".job"):
+            job["status"] = "running"
+        else:
+            return None
+        return job
+
+    def get(self, job_id, out_dir=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return _public(job)
+        job = self._from_disk(job_id, out_dir)
+        return _public(job) if job else None
+
+    def artifact(self, job_id, out_dir=None):
+        """Path of a finished job's file, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        job = job or self._from_disk(job_id, out_dir)
+        return job["_path"] if job and job["status"] == "done" else None
+
+    def shutdown(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=True)
+            self._threads = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
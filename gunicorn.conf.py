@@ -0,0 +1,35 @@
+"""gunicorn settings for the hub: gunicorn -c gunicorn.conf.py wsgi:app
+
+Threaded workers with the app preloaded in the master, recycled after a
+jittered number of requests. Every setting can be overridden from the
+environment (GPSE_BIND, GPSE_WORKERS, GPSE_THREADS, GPSE_MAX_REQUESTS, ...).
+"""
+import multiprocessing
+import os
+
+# Read routes use the read-only pool and each worker writes through one connection.
+os.environ.setdefault("GPSE_DB_READ_POOL", "1")
+# Each worker has its own response cache and only its own writes invalidate it,
+# so keep the window in which another worker can serve stale data short.
+os.environ.setdefault("GPSE_RESPONSE_CACHE_TTL", "5")
+
+bind = os.environ.get("GPSE_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("GPSE_WORKERS", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = "gthread"
+threads = int(os.environ.get("GPSE_THREADS", 4))
+preload_app = True
+max_requests = int(os.environ.get("GPSE_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+timeout = int(os.environ.get("GPSE_TIMEOUT", 120))  # full exports and bulk uploads can take a while
+graceful_timeout = 30
+accesslog = os.environ.get("GPSE_ACCESS_LOG")
+
+
+def post_fork(server, worker):
+    import app as hub
+    hub.close_pool()  # nothing should be open after wsgi.py, but never share a connection across fork
+
+
+def worker_exit(server, worker):
+    import app as hub
+    hub.deck_jobs.shutdown()  # let queued decks finish before the worker is recycled
@@ -0,0 +1,215 @@
+"""Validation and batch insertion of KPI snapshots (NDJSON or CSV uploads).
+
+Rows are validated one by one and reported back with their line number
+instead of being zero-filled. The whole upload is read and checked first
+(check_kpis, reads only); valid rows are then inserted with executemany in
+CHUNK-sized batches inside the caller's transaction (insert_kpis).
+"""
+import codecs
+import csv
+import io
+import json
+from datetime import datetime
+
+KPI_FIELDS = ("report_id", "sla", "p1_incidents", "mttr_minutes", "risk_count", "rag", "created_at")
+RAG_VALUES = ("Green", "Amber", "Red")
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+CHUNK = 5000
+MAX_ERRORS = 1000
+NOT_UTF8 = "not valid UTF-8 (save the file as UTF-8)"
+
+
+def _blank(v):
+    return v is None or (isinstance(v, str) and not v.strip())
+
+
+def _number(row, field, cast, lo, hi, errors):
+    v = row.get(field)
+    if _blank(v):
+        errors[field] = "required"
+        return None
+    if isinstance(v, bool):
+        errors[field] = f"not a valid {cast.__name__}"
+        return None
+    try:
+        if cast is int and isinstance(v, float):
+            if not v.is_integer():
+                raise ValueError(v)
+            x = int(v)
+        else:
+            x = cast(v.strip() if isinstance(v, str) else v)
+    except (TypeError, ValueError):
+        errors[field] = f"not a valid {cast.__name__}: {v!r}"
+        return None
+    if x != x or not lo <= x <= hi:  # x != x catches NaN
+        errors[field] = f"out of range [{lo}, {hi}]: {v!r}"
+        return None
+    return x
+
+
+def validate_kpi(row, default_ts):
+    """Return (values tuple in KPI_FIELDS order, {field: error}); a blank rag is left as None."""
+    errors = {}
+    report_id = "" if _blank(row.get("report_id")) else str(row["report_id"]).strip()
+    if not report_id:
+        errors["report_id"] = "required"
+    sla = _number(row, "sla", float, 0, 100, errors)
+    p1 = _number(row, "p1_incidents", int, 0, 10**9, errors)
+    mttr = _number(row, "mttr_minutes", int, 0, 10**9, errors)
+    risks = _number(row, "risk_count", int, 0, 10**9, errors)
+    rag = None if _blank(row.get("rag")) else str(row["rag"]).strip().capitalize()
+    if rag is not None and rag not in RAG_VALUES:
+        errors["rag"] = f"must be one of {', '.join(RAG_VALUES)}"
+    created_at = default_ts
+    if not _blank(row.get("created_at")):
+        created_at = str(row["created_at"]).strip()
+        try:
+            datetime.strptime(created_at, TS_FORMAT)
+        except ValueError:
+            errors["created_at"] = f"expected YYYY-MM-DD HH:MM:SS: {created_at!r}"
+    return (report_id, sla, p1, mttr, risks, rag, created_at), errors
+
+
+def _decoded_lines(stream, bad):
+    """Decode a binary stream line by line as UTF-8 (BOM stripped), adding undecodable line numbers to bad."""
+    if isinstance(stream, io.RawIOBase):
+        stream = io.BufferedReader(stream)
+    for n, raw in enumerate(stream, 1):
+        if n == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield raw.decode("utf-8")
+        except UnicodeDecodeError:
+            bad.add(n)
+            yield raw.decode("utf-8", "replace")
+
+
+def parse_rows(stream, fmt):
+    """Yield (line number, dict or None, parse error or None) from a binary stream.
+
+    Input must be UTF-8; a line that is not is reported as a parse error rather
+    than failing the whole upload (a CSV row is rejected if any of its lines is).
+    """
+    bad = set()
+    lines = _decoded_lines(stream, bad)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        try:
+            reader.fieldnames
+        except csv.Error as e:
+            yield 1, None, f"invalid CSV: {e}"
+            return
+        if 1 in bad:
+            yield 1, None, NOT_UTF8
+            return
+        first = reader.line_num + 1
+        try:
+            for row in reader:
+                if bad and any(n in bad for n in range(first, reader.line_num + 1)):
+                    yield reader.line_num, None, NOT_UTF8
+                else:
+                    yield reader.line_num, row, None
+                first = reader.line_num + 1
+        except csv.Error as e:
+            yield reader.line_num, None, f"invalid CSV: {e}"
+        return
+    for n, line in enumerate(lines, 1):
+        if n in bad:
+            yield n, None, NOT_UTF8
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield n, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield n, None, "expected a JSON object"
+            continue
+        yield n, row, None
+
+
+def _existing_reports(c, report_ids):
+    found, ids = set(), list(report_ids)
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        marks = ",".join("?" * len(part))
+        found.update(r[0] for r in c.execute(f"SELECT report_id FROM reports WHERE report_id IN ({marks})", part))
+    return found
+
+
+def rate_values(values, rate):
+    """Apply rate(sla, p1, mttr, risks) to a validated values tuple; the computed RAG wins over the given one."""
+    rag = rate(*values[1:5]) if rate else None
+    return values[:5] + (rag or values[5],) + values[6:]
+
+
+def check_kpis(c, rows, now_ts, rate=None):
+    """Read and validate parsed rows without writing; returns (summary, valid value tuples).
+
+    Invalid rows are skipped and listed in "errors" (first MAX_ERRORS). rate,
+    if given, computes the RAG status (see rag_rules.RagEngine.rate); rows it
+    cannot rate must carry their own. Only reads, so c may be a read-only
+    connection and a slow upload holds no write lock.
+    """
+    summary = {"inserted": 0, "rejected": 0, "reports_updated": 0, "errors": []}
+    known, unknown = set(), set()
+    good, batch = [], []
+
+    def reject(line, errors):
+        summary["rejected"] += 1
+        if len(summary["errors"]) < MAX_ERRORS:
+            summary["errors"].append({"line": line, "errors": errors})
+
+    def check_reports(batch):
+        new_ids = {values[0] for _, values in batch} - known - unknown
+        if new_ids:
+            found = _existing_reports(c, new_ids)
+            known.update(found)
+            unknown.update(new_ids - found)
+        for line, values in batch:
+            if values[0] in unknown:
+                reject(line, {"report_id": f"unknown report: {values[0]!r}"})
+            else:
+                good.append(values)
+
+    for line, row, parse_error in rows:
+        if parse_error:
+            reject(line, {"row": parse_error})
+            continue
+        values, errors = validate_kpi(row, now_ts)
+        if not errors:
+            values = rate_values(values, rate)
+            if values[5] is None:
+                errors["rag"] = "required (no KPI rules to compute it)"
+        if errors:
+            reject(line, errors)
+            continue
+        batch.append((line, values))
+        if len(batch) >= CHUNK:
+            check_reports(batch)
+            batch = []
+    if batch:
+        check_reports(batch)
+    return summary, good
+
+
+def insert_kpis(c, summary, good, now_ts, atomic=False):
+    """Insert check_kpis() output in CHUNK-sized batches and bump each affected report's updated_at
+    once; with atomic=True nothing is written if any row was rejected. Updates and returns summary."""
+    if not good or (atomic and summary["rejected"]):
+        return summary
+    for i in range(0, len(good), CHUNK):
+        c.executemany("""INSERT INTO kpis(report_id, sla, p1_incidents, mttr_minutes, risk_count, rag, created_at)
+                         VALUES(?,?,?,?,?,?,?)""", good[i:i + CHUNK])
+    touched = sorted({values[0] for values in good})
+    c.executemany("UPDATE reports SET updated_at=? WHERE report_id=?", [(now_ts, rid) for rid in touched])
+    summary["inserted"], summary["reports_updated"] = len(good), len(touched)
+    return summary
+
+
+def ingest_kpis(c, rows, now_ts, atomic=False, rate=None):
+    """check_kpis() then insert_kpis() on one connection; returns the summary dict."""
+    summary, good = check_kpis(c, rows, now_ts, rate)
+    return insert_kpis(c, summary, good, now_ts, atomic)
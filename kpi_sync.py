@@ -0,0 +1,114 @@
+"""Bulk import / sync of the KPI library (kpi_master) from CSV or NDJSON.
+
+Rows have the shape of /export/kpi_library.csv (updated_at is ignored). Each
+row is identified by (dept_name, kpi_key) and compared with the stored row by
+content_hash, so only new and changed definitions are written, with
+executemany in the caller's transaction once the whole upload has been read.
+Department ids are looked up once; unknown departments are created. With prune=True, KPIs of the departments in
+the upload that the upload no longer lists are deleted.
+
+"rag_rules_changed" in the summary says whether a rule used for snapshot RAG
+status (rag_rules.METRIC_KPIS) was added, changed or removed; stored
+snapshots keep their RAG until recompute_rag() runs.
+"""
+import hashlib
+
+from ingest import MAX_ERRORS, _blank
+from rag_rules import METRIC_KPIS
+
+KEY_FIELDS = ("dept_name", "kpi_key")
+CONTENT_FIELDS = ("section", "kpi_name", "formula_display", "description", "calculation_notes",
+                  "green_rule", "amber_rule", "red_rule", "owner_team")
+REQUIRED = ("dept_name", "kpi_key", "section", "kpi_name", "formula_display")
+RULE_FIELDS = ("green_rule", "amber_rule", "red_rule")
+# kpi_master columns the APIs serve; content_hash is sync bookkeeping and stays internal.
+PUBLIC_COLUMNS = ("kpi_id", "dept_id", "section", "kpi_key", "kpi_name", "formula_display", "description",
+                  "calculation_notes", "green_rule", "amber_rule", "red_rule", "owner_team", "updated_at")
+
+
+def content_hash(values):
+    """Hash of the CONTENT_FIELDS values, in that order."""
+    return hashlib.sha1("\x1f".join("" if v is None else str(v) for v in values).encode("utf-8")).hexdigest()
+
+
+def validate_definition(row):
+    """Return ({field: value}, {field: error}); blank optional fields become ""."""
+    errors, out = {}, {}
+    for field in KEY_FIELDS + CONTENT_FIELDS:
+        v = row.get(field)
+        out[field] = "" if _blank(v) else str(v).strip()
+        if field in REQUIRED and not out[field]:
+            errors[field] = "required"
+    if not out["owner_team"]:
+        out["owner_team"] = "GPSE"
+    return out, errors
+
+
+def sync_library(c, rows, now_ts, atomic=False, prune=False):
+    """Validate parsed (line, row, parse error) tuples and upsert changed definitions; returns a summary.
+
+    Every row is read and validated before the first write, so a slow upload
+    never holds the write lock.
+    """
+    summary = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "rejected": 0,
+               "departments_created": 0, "rag_rules_changed": False, "errors": []}
+    depts = {name: dept_id for dept_id, name in c.execute("SELECT dept_id, dept_name FROM departments")}
+    stored = {(name, key): (h, rules) for name, key, h, *rules in c.execute(
+        """SELECT d.dept_name, km.kpi_key, km.content_hash, km.green_rule, km.amber_rule, km.red_rule
+           FROM kpi_master km JOIN departments d ON d.dept_id = km.dept_id""")}
+
+    def reject(line, errors):
+        summary["rejected"] += 1
+        if len(summary["errors"]) < MAX_ERRORS:
+            summary["errors"].append({"line": line, "errors": errors})
+
+    inserts, updates, seen, rule_keys = [], [], {}, set()
+    for line, row, parse_error in rows:
+        if parse_error:
+            reject(line, {"row": parse_error})
+            continue
+        d, errors = validate_definition(row)
+        if errors:
+            reject(line, errors)
+            continue
+        key = (d["dept_name"], d["kpi_key"])
+        if key in seen:
+            reject(line, {"kpi_key": f"duplicate of line {seen[key]}"})
+            continue
+        seen[key] = line
+        content = tuple(d[f] for f in CONTENT_FIELDS)
+        h = content_hash(content)
+        old = stored.get(key)
+        if old is None:
+            inserts.append((key, content + (now_ts, h)))
+            rule_keys.add(d["kpi_key"])
+        elif old[0] != h:
+            updates.append(content + (now_ts, h, depts[key[0]], key[1]))
+            if tuple(r or "" for r in old[1]) != tuple(d[f] for f in RULE_FIELDS):
+                rule_keys.add(d["kpi_key"])
+        else:
+            summary["unchanged"] += 1
+
+    if atomic and summary["rejected"]:
+        summary["unchanged"] = 0
+        return summary
+    for name in sorted({name for (name, _), _ in inserts} - set(depts)):
+        depts[name] = c.execute("INSERT INTO departments(dept_name) VALUES(?)", (name,)).lastrowid
+        summary["departments_created"] += 1
+    cols = ", ".join(CONTENT_FIELDS)
+    if inserts:
+        c.executemany(f"""INSERT INTO kpi_master(dept_id, kpi_key, {cols}, updated_at, content_hash)
+                          VALUES ({", ".join("?" * (len(CONTENT_FIELDS) + 4))})""",
+                      [(depts[name], key) + values for (name, key), values in inserts])
+    if updates:
+        c.executemany(f"""UPDATE kpi_master SET {", ".join(f"{f}=?" for f in CONTENT_FIELDS)}, updated_at=?, content_hash=?
+                          WHERE dept_id=? AND kpi_key=?""", updates)
+    if prune:
+        uploaded = {name for name, _ in seen}
+        gone = [key for key in stored if key[0] in uploaded and key not in seen]
+        c.executemany("DELETE FROM kpi_master WHERE dept_id=? AND kpi_key=?", [(depts[n], k) for n, k in gone])
+        summary["deleted"] = len(gone)
+        rule_keys.update(key for _, key in gone)
+    summary["inserted"], summary["updated"] = len(inserts), len(updates)
+    summary["rag_rules_changed"] = bool(rule_keys & set(METRIC_KPIS.values()))
+    return summary
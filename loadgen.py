@@ -0,0 +1,124 @@
+"""Synthetic data for exercising the hub at production volumes.
+
+    python loadgen.py big.db --reports 100000 --kpis 1000000
+    python loadgen.py huge.db --reports 1000000 --kpis 10000000 --versions 2000000 --kpi-master 5000
+
+fill() and fill_kpi_library() append rows to an already-migrated database (see app.init_db()).
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from kpi_sync import CONTENT_FIELDS, content_hash
+
+PROJECTS = ["Alpha", "Beta", "Gamma", "Delta", "Epsilon", "Zeta", "Eta", "Theta", "Iota", "Kappa"]
+OWNERS = [f"GPSE{i}" for i in range(1, 41)]
+TYPES = ["Weekly", "Incident", "Monthly", "Risk"]
+STATUSES = ["Draft", "Final"]
+RAGS = ["Green", "Amber", "Red"]
+SECTIONS = ["Availability", "Incident Mgmt", "Change", "Capacity", "Service Desk", "Security", "Ops"]
+TERMS = ["SLA", "MTTR", "backlog", "incident", "change", "latency", "availability", "risk", "capacity", "ticket"]
+BATCH = 10000
+
+
+def _ts(start, seconds):
+    return (start + timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _batched(c, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            c.executemany(sql, batch)
+            batch.clear()
+    if batch:
+        c.executemany(sql, batch)
+
+
+def fill(c, reports=10000, kpis=100000, versions=20000, seed=0, prefix="S", project=None, week=None):
+    """Insert synthetic reports, versions and KPI snapshots; returns the report ids.
+
+    project/week pin every generated report to one value instead of a random one.
+    """
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    span = 2 * 365 * 24 * 3600
+    ids = [f"{prefix}{i:07d}" for i in range(reports)]
+
+    def report_rows():
+        for rid in ids:
+            ts = _ts(start, rnd.randrange(span))
+            p = project or rnd.choice(PROJECTS)
+            w = week or f"W{rnd.randint(1, 52):02d}"
+            yield (rid, p, w, rnd.choice(OWNERS), rnd.choice(TYPES), rnd.choice(STATUSES),
+                   f"https://sharepoint.example/{p}_{w}", ts, ts)
+
+    def version_rows():
+        counts = {}
+        for _ in range(versions):
+            rid = rnd.choice(ids)
+            counts[rid] = counts.get(rid, 0) + 1
+            yield (rid, counts[rid], f"Synthetic change note {counts[rid]}.", _ts(start, rnd.randrange(span)))
+
+    def kpi_rows():
+        for _ in range(kpis):
+            yield (rnd.choice(ids), round(rnd.uniform(95, 100), 2), rnd.randint(0, 5), rnd.randint(5, 240),
+                   rnd.randint(0, 10), rnd.choice(RAGS), _ts(start, rnd.randrange(span)))
+
+    _batched(c, """INSERT INTO reports
+        (report_id, project, week, owner, report_type, status, storage_url, created_at, updated_at)
+        VALUES (?,?,?,?,?,?,?,?,?)""", report_rows())
+    if ids:
+        _batched(c, "INSERT INTO versions(report_id, version_no, notes, created_at) VALUES(?,?,?,?)", version_rows())
+        _batched(c, """INSERT INTO kpis(report_id, sla, p1_incidents, mttr_minutes, risk_count, rag, created_at)
+            VALUES(?,?,?,?,?,?,?)""", kpi_rows())
+    c.execute("ANALYZE")
+    return ids
+
+
+def fill_kpi_library(c, n=1000, seed=0):
+    """Insert n synthetic kpi_master rows (keys SYN_00001...) spread over the existing departments."""
+    rnd = random.Random(seed)
+    depts = [r[0] for r in c.execute("SELECT dept_id FROM departments ORDER BY dept_id")]
+    ts = _ts(datetime(2024, 1, 1), 0)
+
+    def rows():
+        for i in range(n):
+            a, b = rnd.sample(TERMS, 2)
+            lo = rnd.randint(1, 50)
+            dept = rnd.choice(depts)
+            content = (rnd.choice(SECTIONS), f"{a.title()} {b} index {i}", f"{a} / {b} × 100",
+                       f"Synthetic KPI tracking {a} against {b}.", f"Period: weekly; source {b} log.",
+                       f"Green: ≤ {lo}", f"Amber: {lo + 1}–{lo * 2}", f"Red: > {lo * 2}", rnd.choice(OWNERS))
+            yield (dept, f"SYN_{i:05d}") + content + (ts, content_hash(content))
+
+    _batched(c, f"""INSERT INTO kpi_master(dept_id, kpi_key, {", ".join(CONTENT_FIELDS)}, updated_at, content_hash)
+        VALUES ({", ".join("?" * (len(CONTENT_FIELDS) + 4))})""", rows())
+    c.execute("ANALYZE")
+
+
+def main():
+    import app as hub
+
+    ap = argparse.ArgumentParser(description="Fill a hub database with synthetic data.")
+    ap.add_argument("db", help="database file (created and migrated if missing)")
+    ap.add_argument("--reports", type=int, default=10000)
+    ap.add_argument("--kpis", type=int, default=100000)
+    ap.add_argument("--versions", type=int, default=20000)
+    ap.add_argument("--kpi-master", type=int, default=0, help="synthetic KPI library entries")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    hub.DB_PATH = args.db
+    hub.init_db()
+    with hub.conn() as c:
+        fill(c, args.reports, args.kpis, args.versions, args.seed)
+        if args.kpi_master:
+            fill_kpi_library(c, args.kpi_master, args.seed)
+    print(f"{args.db}: +{args.reports} reports, +{args.versions} versions, +{args.kpis} kpis, "
+          f"+{args.kpi_master} KPI library entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Opt-in request profiling: route latency histograms, per-statement SQL timings,
+named phases (init_db, db checkout, template rendering, PPT jobs) and a
+Prometheus text rendering of it all.
+
+The app opens a RequestTimer per request; hooks that fire on the request's
+thread (pool statement/checkout hooks, template signals, span()) add to it and
+to the process-wide totals. Nothing is recorded while no timer is active,
+except observe() calls, which always count.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def normalize_sql(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _sql_labels(sql):
+    return f'id="{hashlib.sha1(sql.encode("utf-8")).hexdigest()[:10]}",sql="{_label(sql[:200])}"'
+
+
+def _label(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v):
+        for i, le in enumerate(self.buckets):
+            if v <= le:
+                self.counts[i] += 1
+                break
+        self.sum += v
+        self.count += 1
+
+    def lines(self, name, labels):
+        out, cum = [], 0
+        for le, n in zip(self.buckets, self.counts):
+            cum += n
+            out.append(f'{name}_bucket{{{labels},le="{le}"}} {cum}')
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+class RequestTimer:
+    def __init__(self, route):
+        self.route = route
+        self.t0 = time.perf_counter()
+        self.phases = {}  # name -> [seconds, count]
+        self.open_spans = {}
+
+    def add(self, phase, seconds):
+        p = self.phases.setdefault(phase, [0.0, 0])
+        p[0] += seconds
+        p[1] += 1
+
+    def server_timing(self, total):
+        parts = [f"total;dur={total * 1000:.1f}"]
+        for name, (secs, n) in self.phases.items():
+            parts.append(f'{name};dur={secs * 1000:.1f};desc="{n}x"')
+        return ", ".join(parts)
+
+
+class Profiler:
+    def __init__(self, slow_ms=100.0, max_statements=500, keep_slow=50):
+        self.slow_s = slow_ms / 1000
+        self.max_statements = max_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._latency = {}   # (method, route) -> Histogram
+        self._requests = {}  # (method, route, status) -> count
+        self._sql = {}       # normalized sql -> [count, seconds, max seconds]
+        self._phases = {}    # name -> [seconds, count]
+        self._observed = {}  # (metric, label) -> Histogram
+        self.slow = deque(maxlen=keep_slow)
+        self.slow_total = 0
+
+    def current(self):
+        return getattr(self._local, "timer", None)
+
+    def begin(self, route):
+        self._local.timer = RequestTimer(route)
+        return self._local.timer
+
+    def end(self, method, status):
+        """Close the thread's timer; returns (timer, total seconds) or (None, 0)."""
+        timer = self.current()
+        if timer is None:
+            return None, 0.0
+        self._local.timer = None
+        total = time.perf_counter() - timer.t0
+        with self._lock:
+            self._latency.setdefault((method, timer.route), Histogram()).observe(total)
+            key = (method, timer.route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            for name, (secs, n) in timer.phases.items():
+                p = self._phases.setdefault(name, [0.0, 0])
+                p[0] += secs
+                p[1] += n
+        return timer, total
+
+    def phase(self, name, seconds):
+        timer = self.current()
+        if timer is not None:
+            timer.add(name, seconds)
+
+    @contextmanager
+    def span(self, name):
+        if self.current() is None:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase(name, time.perf_counter() - t0)
+
+    def start(self, name):
+        timer = self.current()
+        if timer is not None:
+            timer.open_spans[name] = time.perf_counter()
+
+    def stop(self, name):
+        timer = self.current()
+        if timer is not None and name in timer.open_spans:
+            timer.add(name, time.perf_counter() - timer.open_spans.pop(name))
+
+    def statement(self, sql, seconds):
+        """ConnectionPool on_statement hook; returns True for a slow statement."""
+        timer = self.current()
+        if timer is None:
+            return False
+        timer.add("sql", seconds)
+        flat = normalize_sql(sql)
+        with self._lock:
+            s = self._sql.get(flat)
+            if s is None:
+                if len(self._sql) >= self.max_statements:
+                    flat = "(other)"
+                s = self._sql.setdefault(flat, [0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += seconds
+            s[2] = max(s[2], seconds)
+            if seconds >= self.slow_s:
+                self.slow_total += 1
+                self.slow.append({"sql": flat[:500], "ms": round(seconds * 1000, 2), "route": timer.route,
+                                  "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+        return seconds >= self.slow_s
+
+    def observe(self, metric, label, seconds):
+        with self._lock:
+            self._observed.setdefault((metric, label), Histogram()).observe(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            sql = sorted(({"sql": k, "count": c, "seconds": round(t, 6), "max_ms": round(m * 1000, 3)}
+                          for k, (c, t, m) in self._sql.items()), key=lambda s: -s["seconds"])
+            return {"slow_ms": self.slow_s * 1000, "slow_total": self.slow_total,
+                    "slow": list(self.slow), "statements": sql,
+                    "phases": {k: {"seconds": round(s, 6), "count": n} for k, (s, n) in self._phases.items()}}
+
+    def prometheus(self, gauges=()):
+        """Text exposition format; gauges is an iterable of (name, help, value)."""
+        out = []
+        with self._lock:
+            if self._latency:
+                out += ["# HELP gpse_request_duration_seconds Time until the view returned a response.",
+                        "# TYPE gpse_request_duration_seconds histogram"]
+                for (method, route), h in sorted(self._latency.items()):
+                    out += h.lines("gpse_request_duration_seconds", f'method="{method}",route="{_label(route)}"')
+                out += ["# TYPE gpse_requests_total counter"]
+                for (method, route, status), n in sorted(self._requests.items()):
+                    out.append(f'gpse_requests_total{{method="{method}",route="{_label(route)}",status="{status}"}} {n}')
+            if self._phases:
+                out += ["# HELP gpse_phase_seconds_total Request time spent per phase.",
+                        "# TYPE gpse_phase_seconds_total counter"]
+                out += [f'gpse_phase_seconds_total{{phase="{k}"}} {s:.6f}' for k, (s, _) in sorted(self._phases.items())]
+                out += ["# TYPE gpse_phase_calls_total counter"]
+                out += [f'gpse_phase_calls_total{{phase="{k}"}} {n}' for k, (_, n) in sorted(self._phases.items())]
+            if self._sql:
+                out += ["# TYPE gpse_sql_statements_total counter"]
+                out += [f'gpse_sql_statements_total{{{_sql_labels(k)}}} {c}' for k, (c, _, _) in self._sql.items()]
+                out += ["# TYPE gpse_sql_seconds_total counter"]
+                out += [f'gpse_sql_seconds_total{{{_sql_labels(k)}}} {t:.6f}' for k, (_, t, _) in self._sql.items()]
+                out += ["# TYPE gpse_sql_seconds_max gauge"]
+                out += [f'gpse_sql_seconds_max{{{_sql_labels(k)}}} {m:.6f}' for k, (_, _, m) in self._sql.items()]
+            out += ["# HELP gpse_sql_slow_total Statements slower than the slow-query threshold.",
+                    "# TYPE gpse_sql_slow_total counter", f"gpse_sql_slow_total {self.slow_total}"]
+            last = None
+            for (metric, label), h in sorted(self._observed.items()):
+                if metric != last:
+                    out.append(f"# TYPE {metric} histogram")
+                    last = metric
+                out += h.lines(metric, f'kind="{_label(label)}"')
+        for name, help_text, value in gauges:
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(out) + "\n"
@@ -0,0 +1,157 @@
+"""Query-plan regression check for every SQL statement the routes issue.
+
+Seeds a throwaway database with loadgen.fill(), drives each route in ROUTES
+through the test client while a trace callback records the statements it runs,
+then EXPLAIN QUERY PLANs each one and fails if a table is read with a full scan
+that is not listed in KNOWN_SCANS.
+
+    python query_plans.py                      # 100k reports, 1M kpis
+    python query_plans.py --reports 2000 --kpis 20000 -v
+
+Add new routes to ROUTES; remove KNOWN_SCANS entries once a query stops scanning.
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import app as hub
+import loadgen
+from bench import use_flat_templates
+
+ROUTES = [
+    ("GET", "/dashboard", None),
+    ("GET", "/dashboard?q=alpha", None),
+    ("GET", "/dashboard?project=Alpha", None),
+    ("GET", "/dashboard?week=W10", None),
+    ("GET", "/dashboard?owner=GPSE3", None),
+    ("GET", "/dashboard?report_type=Weekly", None),
+    ("GET", "/dashboard?project=Beta&week=W20&owner=GPSE2&report_type=Incident", None),
+    ("GET", "/dashboard?after=2025-06-01%2000:00:00|S0000100", None),
+    ("GET", "/dashboard/rows?project=Alpha&after=2025-06-01%2000:00:00|S0000100", None),
+    ("GET", "/dashboard/rows?q=gpse1&after=2025-06-01%2000:00:00|S0000100", None),
+    ("GET", "/dashboard/rows?week=W10&owner=GPSE3&after=2025-06-01%2000:00:00|S0000100", None),
+    ("POST", "/create", {"report_id": "QP001", "project": "Alpha", "week": "W10", "owner": "GPSE1",
+                         "report_type": "Weekly", "status": "Draft"}),
+    ("GET", "/report/R001", None),
+    ("GET", "/report/R002", None),
+    ("GET", "/api/reports/R001/history?archived=1", None),
+    ("POST", "/add_version/R001", {"notes": "plan check"}),
+    ("POST", "/add_kpi/R001", {"sla": "99.1", "p1_incidents": "1", "mttr_minutes": "40", "risk_count": "2"}),
+    ("POST", "/generate_ppt/R001", None),
+    ("GET", "/kpi-library", None),
+    ("GET", "/api/departments", None),
+    ("GET", "/api/kpis_list?dept_id=1", None),
+    ("GET", "/api/kpis_list?dept_id=1&section=NFPE", None),
+    ("GET", "/api/kpis_list?dept_id=2&search=mttr", None),
+    ("GET", "/api/kpi/1", None),
+    ("GET", "/api/kpi_master", None),
+    ("GET", "/utilities", None),
+    ("GET", "/assistant?q=sla", None),
+    ("GET", "/api/reports", None),
+    ("GET", "/api/reports?limit=500", None),
+    ("GET", "/api/reports?limit=500&after=S0001000&fields=report_id,updated_at", None),
+    ("GET", "/api/reports?limit=500&updated_since=2025-06-01", None),
+    ("GET", "/api/kpis", None),
+    ("GET", "/api/kpis?limit=500&after=S0001000", None),
+    ("GET", "/api/kpis?limit=500&updated_since=2025-06-01", None),
+    ("GET", "/api/kpis?limit=500&updated_since=2025-06-01&after=2025-07-01%2000:00:00|S0000001", None),
+    ("GET", "/api/kpi_master?limit=100&after=3", None),
+    ("GET", "/api/kpis/1", None),
+    ("GET", "/api/changes?since=1", None),
+    ("GET", "/api/kpi_trends", None),
+    ("GET", "/api/kpi_trends?project=Alpha", None),
+    ("GET", "/api/kpi_trends?by=project,report_type&week=W10&percentiles=50,95", None),
+    ("GET", "/export/kpis.csv", None),
+    ("GET", "/export/kpi_library.csv", None),
+]
+
+# (pattern matched against the statement, why a full scan is acceptable)
+KNOWN_SCANS = [
+    (r"FROM kpi_rollup WHERE snapshots > 0 GROUP BY|FROM kpi_rollup$", "rollups have one row per project/week/type"),
+    (r"FROM kpi_master WHERE kpi_key IN", "seeded KPI library is tiny; idx_kpi_master_key is used once it grows"),
+    (r"FROM kpi_mttr_hist WHERE n > 0 GROUP BY", "unfiltered MTTR histogram for trends"),
+    (r"FROM report_facets WHERE", "facet cube has one row per project/week/owner/type combination"),
+    (r"FROM reports r WHERE 1=1$", "unpaginated /api/reports feed"),
+    (r"LEFT JOIN kpi_latest .* WHERE 1=1$", "unpaginated /api/kpis feed"),
+    (r"LEFT JOIN kpi_latest .* ORDER BY r\.week DESC", "full KPI export"),
+]
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+SKIP = re.compile(r"^\s*(--|PRAGMA|BEGIN|COMMIT|ROLLBACK|INSERT|CREATE|ANALYZE)", re.I)
+
+
+def normalize(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def collect_statements(client):
+    seen = []
+    def trace(sql):
+        # 'main'.<table> statements are FTS5's own shadow-table bookkeeping.
+        if not SKIP.match(sql) and "'main'." not in sql and sql not in seen:
+            seen.append(sql)
+    hub.close_pool()
+    hub.get_pool().on_connect.append(lambda c: c.set_trace_callback(trace))
+    for method, path, data in ROUTES:
+        r = client.open(path, method=method, data=data)
+        if r.status_code >= 500:
+            raise SystemExit(f"{method} {path} returned {r.status_code}")
+    hub.close_pool()
+    return seen
+
+
+def full_scans(c, sql):
+    plan = c.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    return [row["detail"] for row in plan if FULL_SCAN.match(row["detail"])], plan
+
+
+def check(statements, verbose=False):
+    failures = 0
+    with hub.conn() as c:
+        for sql in statements:
+            flat = normalize(sql)
+            scans, plan = full_scans(c, sql)
+            known = next((why for pat, why in KNOWN_SCANS if re.search(pat, flat)), None)
+            if scans and not known:
+                failures += 1
+                print(f"FAIL {', '.join(scans)}\n  {flat}")
+            elif verbose:
+                tag = f"known: {known}" if scans else "ok"
+                print(f"{tag:<12} {flat[:110]}")
+            if verbose or (scans and not known):
+                for row in plan:
+                    print(f"    {row['detail']}")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN every statement the routes run.")
+    ap.add_argument("--reports", type=int, default=100000)
+    ap.add_argument("--kpis", type=int, default=1000000)
+    ap.add_argument("--versions", type=int, default=200000)
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="gpse-plans-")
+    try:
+        hub.DB_PATH = os.path.join(tmp, "plans.db")
+        hub.PPT_DIR = tmp
+        use_flat_templates()
+        hub.create_app()
+        with hub.conn() as c:
+            loadgen.fill(c, args.reports, args.kpis, args.versions)
+        statements = collect_statements(hub.app.test_client())
+        failures = check(statements, args.verbose)
+    finally:
+        hub.close_pool()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{len(statements)} statements checked, {failures} unexpected full scan(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
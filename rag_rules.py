@@ -0,0 +1,146 @@
+"""RAG status from the kpi_master green/amber/red rules.
+
+Rule text such as "Green: ≤ 45", "Amber: 97.0%–98.99%" or "Red: > 5%" is
+parsed once into Interval predicates (cached by text). A RagEngine maps the
+four snapshot columns to their library KPIs and rates a snapshot in Python at
+ingestion, or renders the same logic as one SQL CASE expression so every
+stored snapshot can be re-rated with a single UPDATE.
+
+Per metric: red if the red rule matches, green if the green rule matches,
+otherwise amber (this includes values falling in a gap between rules). The
+snapshot gets the worst metric; metrics without a value or rules are ignored.
+"""
+import re
+from functools import lru_cache
+
+# kpis column -> kpi_master.kpi_key whose rules rate it
+METRIC_KPIS = {
+    "sla": "SD_SLA",
+    "p1_incidents": "INC_P1_COUNT",
+    "mttr_minutes": "INC_MTTR_P1",
+    "risk_count": "OPS_ACTIVE_RISKS",
+}
+RAG_BY_SEVERITY = ("Green", "Amber", "Red")
+
+_NUM = r"(-?\d+(?:\.\d+)?)"
+_RANGE = re.compile(rf"^{_NUM}\s*(?:–|—|-|to)\s*{_NUM}$")
+_COMPARE = re.compile(rf"^(<=|>=|≤|≥|<|>|=)?\s*{_NUM}$")
+_LABEL = re.compile(r"^\s*(green|amber|red)\s*:", re.I)
+
+
+class Interval:
+    """lo/hi bounds (None = unbounded) with inclusive flags; callable and renderable as SQL."""
+    __slots__ = ("lo", "lo_incl", "hi", "hi_incl")
+
+    def __init__(self, lo=None, lo_incl=True, hi=None, hi_incl=True):
+        self.lo, self.lo_incl, self.hi, self.hi_incl = lo, lo_incl, hi, hi_incl
+
+    def __call__(self, x):
+        if self.lo is not None and (x < self.lo if self.lo_incl else x <= self.lo):
+            return False
+        if self.hi is not None and (x > self.hi if self.hi_incl else x >= self.hi):
+            return False
+        return True
+
+    def sql(self, col):
+        parts = []
+        if self.lo is not None:
+            parts.append(f"{col} {'>=' if self.lo_incl else '>'} {self.lo!r}")
+        if self.hi is not None:
+            parts.append(f"{col} {'<=' if self.hi_incl else '<'} {self.hi!r}")
+        return " AND ".join(parts) or "1"
+
+    def __repr__(self):
+        lo = "(-inf" if self.lo is None else f"{'[' if self.lo_incl else '('}{self.lo}"
+        hi = "+inf)" if self.hi is None else f"{self.hi}{']' if self.hi_incl else ')'}"
+        return f"Interval{lo}, {hi}"
+
+
+@lru_cache(maxsize=256)
+def parse_rule(text):
+    """Interval for one rule string, or None if it is empty or not understood."""
+    if not text:
+        return None
+    s = _LABEL.sub("", text).replace("%", "").replace(",", "").strip()
+    m = _RANGE.match(s)
+    if m:
+        lo, hi = float(m.group(1)), float(m.group(2))
+        return Interval(min(lo, hi), True, max(lo, hi), True)
+    m = _COMPARE.match(s)
+    if not m:
+        return None
+    op, x = m.group(1) or "=", float(m.group(2))
+    return {
+        "<": Interval(hi=x, hi_incl=False), "<=": Interval(hi=x), "≤": Interval(hi=x),
+        ">": Interval(lo=x, lo_incl=False), ">=": Interval(lo=x), "≥": Interval(lo=x),
+        "=": Interval(x, True, x, True),
+    }[op]
+
+
+class RagEngine:
+    def __init__(self, rules):
+        # rules: {metric: (green, amber, red) Intervals or None}; metrics with no usable rule are dropped
+        self.rules = {m: preds for m, preds in rules.items() if preds[0] or preds[2]}
+
+    def severity(self, metric, value):
+        green, _, red = self.rules[metric]
+        if value is None:
+            return None
+        if red and red(value):
+            return 2
+        if green and green(value):
+            return 0
+        return 1
+
+    def rate(self, sla, p1_incidents, mttr_minutes, risk_count):
+        """'Green' / 'Amber' / 'Red', or None when no metric could be rated."""
+        values = {"sla": sla, "p1_incidents": p1_incidents, "mttr_minutes": mttr_minutes, "risk_count": risk_count}
+        worst = max((s for s in (self.severity(m, values[m]) for m in self.rules) if s is not None), default=None)
+        return None if worst is None else RAG_BY_SEVERITY[worst]
+
+    def sql(self, alias=""):
+        """SQL expression equivalent to rate() over a kpis row; NULL when no metric could be rated."""
+        cases = []
+        for metric, (green, _, red) in self.rules.items():
+            col = f"{alias}{metric}"
+            case = f"CASE WHEN {col} IS NULL THEN -1"
+            if red:
+                case += f" WHEN {red.sql(col)} THEN 2"
+            if green:
+                case += f" WHEN {green.sql(col)} THEN 0"
+            cases.append(case + " ELSE 1 END")
+        if not cases:
+            return "NULL"
+        worst = cases[0] if len(cases) == 1 else f"max({', '.join(cases)})"
+        return f"(CASE {worst} WHEN 2 THEN 'Red' WHEN 1 THEN 'Amber' WHEN 0 THEN 'Green' END)"
+
+
+@lru_cache(maxsize=8)
+def compile_rules(rule_rows):
+    """RagEngine from ((metric, green_text, amber_text, red_text), ...); cached by the rule texts."""
+    return RagEngine({m: (parse_rule(g), parse_rule(a), parse_rule(r)) for m, g, a, r in rule_rows})
+
+
+def load_engine(c):
+    """RagEngine for the rules currently in kpi_master (parsing only happens when a rule text changes)."""
+    metric_by_key = {key: metric for metric, key in METRIC_KPIS.items()}
+    marks = ",".join("?" * len(metric_by_key))
+    rows, seen = [], set()
+    found = c.execute(f"""SELECT kpi_id, kpi_key, green_rule, amber_rule, red_rule FROM kpi_master
+                          WHERE kpi_key IN ({marks})""", list(metric_by_key)).fetchall()
+    for r in sorted(found, key=lambda r: r["kpi_id"]):  # same key in several departments: first one wins
+        metric = metric_by_key[r["kpi_key"]]
+        if metric not in seen:
+            seen.add(metric)
+            rows.append((metric, r["green_rule"], r["amber_rule"], r["red_rule"]))
+    return compile_rules(tuple(sorted(rows)))
+
+
+def recompute_rag(c, engine=None):
+    """Re-rate every stored snapshot with one UPDATE; returns the number of rows changed."""
+    engine = engine or load_engine(c)
+    expr = engine.sql()
+    if expr == "NULL":
+        return 0
+    rag = f"COALESCE({expr}, rag)"
+    return c.execute(f"UPDATE kpis SET rag = {rag} WHERE rag IS NOT {rag}").rowcount
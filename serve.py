@@ -0,0 +1,46 @@
+"""Run the hub with a multi-threaded production server on any OS.
+
+    python serve.py [--host 127.0.0.1] [--port 5000] [--threads 8]
+
+Uses waitress when it is installed (pip install waitress), otherwise falls back
+to werkzeug's threaded server. On Linux, gunicorn with gunicorn.conf.py adds
+multiple worker processes and recycling.
+"""
+import argparse
+import os
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default=os.environ.get("GPSE_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.environ.get("GPSE_PORT", 5000)))
+    ap.add_argument("--threads", type=int, default=int(os.environ.get("GPSE_THREADS", 8)))
+    args = ap.parse_args()
+
+    # Imported here, not at module level: deck workers are spawned and re-import
+    # this module as __mp_main__, and must not configure the app or touch the database.
+    # The env default must be set before the app is configured.
+    os.environ.setdefault("GPSE_DB_READ_POOL", "1")
+    from wsgi import app
+
+    try:
+        if waitress:
+            print(f"Serving on http://{args.host}:{args.port} (waitress, {args.threads} threads)")
+            waitress.serve(app, host=args.host, port=args.port, threads=args.threads)
+        else:
+            from werkzeug.serving import run_simple
+            print(f"waitress not installed; serving on http://{args.host}:{args.port} with werkzeug's threaded server")
+            run_simple(args.host, args.port, app, threaded=True)
+    finally:
+        import app as hub
+        hub.deck_jobs.shutdown()
+        hub.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as hub  # noqa: E402
+from bench import use_flat_templates  # noqa: E402
+
+
+@pytest.fixture
+def gpse(tmp_path, monkeypatch):
+    """The app module migrated and seeded against a fresh database in tmp_path."""
+    monkeypatch.setattr(hub, "DB_PATH", str(tmp_path / "gpse.db"))
+    monkeypatch.setattr(hub, "PPT_DIR", str(tmp_path / "ppt"))
+    use_flat_templates()
+    hub.create_app()
+    hub.data_changed()
+    hub.fragment_cache.invalidate()
+    yield hub
+    hub.close_pool()
+
+
+@pytest.fixture
+def client(gpse):
+    return gpse.app.test_client()
@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+import archive
+
+OLD = "2020-01-0{} 00:00:00"
+
+
+def add_snapshots(gpse, report_id, n):
+    with gpse.conn() as c:
+        c.executemany("""INSERT INTO kpis(report_id, sla, p1_incidents, mttr_minutes, risk_count, rag, created_at)
+                         VALUES (?, 99, 0, 10, 0, 'Green', ?)""", [(report_id, OLD.format(i)) for i in range(1, n + 1)])
+
+
+def history_ids(client, report_id):
+    return [k["id"] for k in client.get(f"/api/reports/{report_id}/history?archived=1").get_json()["kpis"]]
+
+
+def test_archive_moves_old_rows_and_history_spans_both(gpse, client):
+    add_snapshots(gpse, "R001", 3)
+    before = history_ids(client, "R001")
+    with gpse.conn() as c:
+        assert archive.archive_old(c, gpse.archive_path(), 1)["kpis"] == 3
+        assert c.execute("SELECT COUNT(*) FROM kpis WHERE report_id='R001'").fetchone()[0] == 1
+    assert sorted(history_ids(client, "R001")) == sorted(before)
+
+
+def test_rerun_after_partial_copy_is_safe(gpse):
+    add_snapshots(gpse, "R001", 2)
+    with gpse.conn() as c:
+        archive.archive_old(c, gpse.archive_path(), 1)
+    a = sqlite3.connect(gpse.archive_path())
+    row = a.execute("SELECT * FROM kpis ORDER BY id LIMIT 1").fetchone()
+    a.execute("DELETE FROM kpis WHERE id=?", (row[0],))
+    a.commit()
+    a.close()
+    with gpse.conn() as c:  # as if the hot delete had not committed
+        c.execute("INSERT INTO kpis VALUES (?,?,?,?,?,?,?,?)", row)
+        c.commit()
+        assert archive.archive_old(c, gpse.archive_path(), 1)["kpis"] == 1
+
+
+def test_conflicting_archive_ids_stop_the_run(gpse, client):
+    add_snapshots(gpse, "R001", 3)
+    with gpse.conn() as c:
+        archive.archive_old(c, gpse.archive_path(), 1)
+    a = sqlite3.connect(gpse.archive_path())
+    rows = a.execute("SELECT * FROM kpis").fetchall()
+    # Same ids, different rows: an archive left over from another database.
+    a.execute("UPDATE kpis SET report_id='R002', sla=50")
+    a.commit()
+    a.close()
+    with gpse.conn() as c:
+        c.executemany("INSERT INTO kpis VALUES (?,?,?,?,?,?,?,?)", rows)
+        c.commit()
+        with pytest.raises(ValueError, match="different content"):
+            archive.archive_old(c, gpse.archive_path(), 1)
+        assert c.execute("SELECT COUNT(*) FROM kpis WHERE report_id='R001'").fetchone()[0] == 4
+
+
+def test_reset_demo_removes_the_archive(gpse, client):
+    add_snapshots(gpse, "R002", 3)
+    with gpse.conn() as c:
+        archive.archive_old(c, gpse.archive_path(), 1)
+    client.post("/admin/reset-demo")
+    add_snapshots(gpse, "R001", 3)
+    with gpse.conn() as c:
+        assert archive.archive_old(c, gpse.archive_path(), 1)["kpis"] == 3
+    assert len(history_ids(client, "R001")) == 4
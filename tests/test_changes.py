@@ -0,0 +1,32 @@
+def test_stream_slots_are_capped_and_released(gpse, client):
+    cap = gpse.app.config["CHANGES_MAX_STREAMS"]
+    open_streams = [client.get("/api/changes/stream") for _ in range(cap)]
+    assert [r.status_code for r in open_streams] == [200] * cap
+    assert client.get("/api/changes/stream").status_code == 503
+    for r in open_streams:
+        r.close()
+    r = client.get("/api/changes/stream")
+    assert r.status_code == 200
+    r.close()
+
+
+def test_failed_stream_setup_returns_its_slot(gpse, client, monkeypatch):
+    def unavailable(c):
+        raise TimeoutError("no free connection")
+    last_seq = gpse.last_seq
+    monkeypatch.setattr(gpse, "last_seq", unavailable)
+    monkeypatch.setitem(gpse.app.config, "PROPAGATE_EXCEPTIONS", False)  # answer 500 instead of raising
+    for _ in range(gpse.app.config["CHANGES_MAX_STREAMS"] + 1):
+        assert client.get("/api/changes/stream").status_code == 500
+    monkeypatch.setattr(gpse, "last_seq", last_seq)
+    r = client.get("/api/changes/stream")
+    assert r.status_code == 200
+    r.close()
+
+
+def test_changes_since(client):
+    client.post("/add_version/R001", data={"notes": "checked"})
+    body = client.get("/api/changes?since=0").get_json()
+    assert [c["kind"] for c in body["changes"]] == ["version"]
+    assert body["reset"] is False
+    assert client.get(f"/api/changes?since={body['last_seq'] + 5}").get_json()["reset"] is True
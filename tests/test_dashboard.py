@@ -0,0 +1,7 @@
+def test_cached_dashboard_shows_the_normalized_filters(client):
+    first = client.get("/dashboard?q=alpha%20&project=Alpha%20").get_data(as_text=True)
+    second = client.get("/dashboard?q=alpha&project=Alpha").get_data(as_text=True)
+    assert first == second
+    assert 'name="q" value="alpha"' in second
+    assert '<option value="Alpha" selected>' in second
+    assert '<input type="hidden" name="project" value="Alpha">' in second
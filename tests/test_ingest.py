@@ -0,0 +1,97 @@
+import io
+import json
+
+from ingest import NOT_UTF8, ingest_kpis, parse_rows, validate_kpi
+from rag_rules import load_engine
+
+TS = "2025-06-01 10:00:00"
+GOOD = {"report_id": "R001", "sla": 99.5, "p1_incidents": 0, "mttr_minutes": 30, "risk_count": 1}
+
+
+def ndjson(*lines):
+    return io.BytesIO(b"".join((line if isinstance(line, bytes) else json.dumps(line).encode()) + b"\n"
+                               for line in lines))
+
+
+def test_validate_kpi_reports_each_field():
+    _, errors = validate_kpi({"sla": "101", "p1_incidents": "1.5", "mttr_minutes": "", "risk_count": True,
+                              "rag": "Purple", "created_at": "01/06/2025"}, TS)
+    assert set(errors) == {"report_id", "sla", "p1_incidents", "mttr_minutes", "risk_count", "rag", "created_at"}
+    values, errors = validate_kpi({**GOOD, "sla": " 98.5 ", "rag": "amber"}, TS)
+    assert errors == {}
+    assert values == ("R001", 98.5, 0, 30, 1, "Amber", TS)
+
+
+def test_parse_rows_ndjson_line_errors():
+    rows = list(parse_rows(ndjson(GOOD, b"{not json", b"[1, 2]", b"", b'{"report_id": "R\xe9"}', GOOD), "ndjson"))
+    assert [(n, err is None) for n, _, err in rows] == [(1, True), (2, False), (3, False), (5, False), (6, True)]
+    assert rows[2][2] == "expected a JSON object"
+    assert rows[3][2] == NOT_UTF8
+
+
+def test_parse_rows_csv_bom_and_line_numbers():
+    data = ("﻿report_id,sla,p1_incidents,mttr_minutes,risk_count\r\n"
+            "R001,99,0,10,0\r\n").encode() + b'R001,"9\xe9\r\n9",0,1,0\r\nR002,98,0,10,0\r\n'
+    rows = list(parse_rows(io.BytesIO(data), "csv"))
+    assert rows[0] == (2, {"report_id": "R001", "sla": "99", "p1_incidents": "0", "mttr_minutes": "10",
+                           "risk_count": "0"}, None)
+    assert rows[1] == (4, None, NOT_UTF8)
+    assert rows[2][0] == 5 and rows[2][1]["report_id"] == "R002"
+
+
+def test_parse_rows_rejects_cp1252_header():
+    data = "report_id,sla°\r\nR001,99\r\n".encode("cp1252")
+    assert list(parse_rows(io.BytesIO(data), "csv")) == [(1, None, NOT_UTF8)]
+
+
+def test_ingest_requires_rag_without_rules(gpse):
+    with gpse.conn() as c:
+        summary = ingest_kpis(c, parse_rows(ndjson(GOOD, {**GOOD, "rag": "Red"}), "ndjson"), TS)
+        assert summary["inserted"] == 1
+        assert summary["errors"] == [{"line": 1, "errors": {"rag": "required (no KPI rules to compute it)"}}]
+
+
+def count_kpis(c):
+    return c.execute("SELECT COUNT(*) FROM kpis").fetchone()[0]
+
+
+def test_ingest_skips_invalid_rows(gpse):
+    with gpse.conn() as c:
+        before = count_kpis(c)
+        rows = parse_rows(ndjson(GOOD, {**GOOD, "sla": 150}, {**GOOD, "report_id": "NOPE"}, b"oops", GOOD), "ndjson")
+        summary = ingest_kpis(c, rows, TS, rate=load_engine(c).rate)
+        assert summary["inserted"] == 2
+        assert summary["rejected"] == 3
+        assert summary["reports_updated"] == 1
+        assert sorted((e["line"], sorted(e["errors"])) for e in summary["errors"]) == [
+            (2, ["sla"]), (3, ["report_id"]), (4, ["row"])]
+        assert count_kpis(c) == before + 2
+        assert c.execute("SELECT rag FROM kpis ORDER BY id DESC LIMIT 1").fetchone()[0] == "Green"
+        assert c.execute("SELECT updated_at FROM reports WHERE report_id='R001'").fetchone()[0] == TS
+
+
+def test_ingest_atomic_rejects_whole_upload(gpse):
+    with gpse.conn() as c:
+        before = count_kpis(c)
+        updated = c.execute("SELECT updated_at FROM reports WHERE report_id='R001'").fetchone()[0]
+        summary = ingest_kpis(c, parse_rows(ndjson(GOOD, GOOD, {**GOOD, "report_id": "NOPE"}), "ndjson"),
+                              TS, atomic=True, rate=load_engine(c).rate)
+        assert (summary["inserted"], summary["rejected"]) == (0, 1)
+        assert count_kpis(c) == before
+        assert c.execute("SELECT updated_at FROM reports WHERE report_id='R001'").fetchone()[0] == updated
+
+
+def test_bulk_route_rejects_undecodable_body(client):
+    r = client.post("/api/kpis/bulk", data=b"\xff\xfe{\x00}\x00\n")
+    assert r.status_code == 400
+    assert r.get_json()["errors"] == [{"line": 1, "errors": {"row": NOT_UTF8}}]
+
+
+def test_ingest_reads_everything_before_writing(gpse):
+    with gpse.conn() as c:
+        def rows():
+            for n in range(1, 12002):  # spans several CHUNK-sized batches
+                assert not c.in_transaction, f"write transaction open while reading line {n}"
+                yield n, GOOD, None
+        summary = ingest_kpis(c, rows(), TS, rate=load_engine(c).rate)
+        assert summary["inserted"] == 12001
@@ -0,0 +1,106 @@
+import csv
+import io
+
+from kpi_sync import content_hash, sync_library, validate_definition
+
+TS = "2025-06-01 10:00:00"
+
+
+def library_csv(client):
+    return list(csv.DictReader(io.StringIO(client.get("/export/kpi_library.csv").get_data(as_text=True))))
+
+
+def upload(rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode()
+
+
+def rag_of(client, report_id):
+    return {k["report_id"]: k["rag"] for k in client.get("/api/kpis").get_json()}[report_id]
+
+
+def numbered(rows):
+    return ((n, row, None) for n, row in enumerate(rows, 2))
+
+
+def test_validate_definition():
+    d, errors = validate_definition({"dept_name": " Ops ", "kpi_key": "K1", "section": "Ops", "kpi_name": "K"})
+    assert errors == {"formula_display": "required"}
+    assert d["dept_name"] == "Ops" and d["owner_team"] == "GPSE" and d["description"] == ""
+
+
+def test_content_hash_depends_on_order_and_blanks():
+    assert content_hash(("a", "b")) != content_hash(("b", "a"))
+    assert content_hash(("a", None)) == content_hash(("a", ""))
+
+
+def test_reimporting_the_export_changes_nothing(client):
+    rows = library_csv(client)
+    r = client.post("/api/kpi_master/import?format=csv", data=upload(rows))
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body["unchanged"] == len(rows) == 7
+    assert (body["inserted"], body["updated"], body["deleted"], body["rejected"]) == (0, 0, 0, 0)
+    assert body["rag_rules_changed"] is False
+
+
+def test_sync_inserts_updates_and_creates_departments(gpse):
+    with gpse.conn() as c:
+        rows = [dict(r) for r in c.execute("""SELECT d.dept_name, km.* FROM kpi_master km
+                                               JOIN departments d ON d.dept_id = km.dept_id""")]
+        rows[0]["description"] = "Changed."
+        rows.append({**rows[1], "dept_name": "New Dept", "kpi_key": "NEW_KPI"})
+        summary = sync_library(c, numbered(rows), TS)
+        assert (summary["inserted"], summary["updated"], summary["unchanged"]) == (1, 1, 6)
+        assert summary["departments_created"] == 1
+        assert summary["rag_rules_changed"] is False
+        stored = c.execute("SELECT content_hash, updated_at FROM kpi_master WHERE kpi_key=?",
+                           (rows[0]["kpi_key"],)).fetchone()
+        assert stored["updated_at"] == TS
+        assert stored["content_hash"] == content_hash([rows[0][f] or "" for f in (
+            "section", "kpi_name", "formula_display", "description", "calculation_notes",
+            "green_rule", "amber_rule", "red_rule", "owner_team")])
+
+
+def test_atomic_import_writes_nothing_on_error(client):
+    rows = library_csv(client)
+    rows[0]["kpi_name"] = "Renamed"
+    rows[1]["formula_display"] = ""
+    r = client.post("/api/kpi_master/import?format=csv&atomic=1", data=upload(rows))
+    assert r.status_code == 400
+    assert r.get_json()["errors"] == [{"line": 3, "errors": {"formula_display": "required"}}]
+    assert library_csv(client)[0]["kpi_name"] != "Renamed"
+
+
+def test_prune_deletes_unlisted_kpis_of_uploaded_departments(client):
+    rows = [r for r in library_csv(client) if r["dept_name"] == "NFPE"]
+    r = client.post("/api/kpi_master/import?format=csv&prune=1", data=upload(rows[:1]))
+    assert r.get_json()["deleted"] == 1
+    assert len(library_csv(client)) == 6
+
+
+def test_rule_change_rerates_snapshots(client):
+    r = client.post("/api/kpis/bulk", data=b'{"report_id": "R001", "sla": 96.5, "p1_incidents": 0, '
+                                           b'"mttr_minutes": 10, "risk_count": 0}\n')
+    assert r.get_json()["inserted"] == 1
+    assert rag_of(client, "R001") == "Red"
+
+    rows = library_csv(client)
+    sla = next(r for r in rows if r["kpi_key"] == "SD_SLA")
+    sla.update(green_rule="Green: ≥ 96.0%", amber_rule="Amber: 95.0%–95.99%", red_rule="Red: < 95.0%")
+    r = client.post("/api/kpi_master/import?format=csv&recompute_rag=1", data=upload(rows))
+    body = r.get_json()
+    assert (body["updated"], body["rag_rules_changed"]) == (1, True)
+    assert body["snapshots_rerated"] >= 1
+    assert rag_of(client, "R001") == "Green"
+
+
+def test_rule_change_without_recompute_keeps_stored_rag(client):
+    rows = library_csv(client)
+    next(r for r in rows if r["kpi_key"] == "SD_SLA")["red_rule"] = "Red: < 50%"
+    body = client.post("/api/kpi_master/import?format=csv", data=upload(rows)).get_json()
+    assert body["rag_rules_changed"] is True
+    assert "snapshots_rerated" not in body
@@ -0,0 +1,11 @@
+import loadgen
+import query_plans
+
+
+def test_routes_use_indexes(gpse, client):
+    """query_plans.py at a small scale: no route statement may fall back to an unexpected full scan."""
+    with gpse.conn() as c:
+        loadgen.fill(c, 2000, 20000, 4000)
+    statements = query_plans.collect_statements(client)
+    assert len(statements) > 40
+    assert query_plans.check(statements) == 0
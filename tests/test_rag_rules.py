@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from rag_rules import compile_rules, parse_rule
+
+
+@pytest.mark.parametrize("text, inside, outside", [
+    ("Green: < 2%", [0, 1.99], [2, 3]),
+    ("Amber: 2%–5%", [2, 3.5, 5], [1.99, 5.01]),
+    ("Red: > 5%", [5.01, 100], [5]),
+    ("Amber: 0.5%–1.0%", [0.5, 1.0], [0.49, 1.01]),
+    ("Green: 0", [0], [1]),
+    ("Amber: 1–2", [1, 2], [0, 3]),
+    ("Red: ≥ 3", [3, 10], [2.99]),
+    ("Green: ≤ 45", [0, 45], [45.5, 46]),
+    ("Red: > 90", [91], [90]),
+    ("Green: ≥ 99.0%", [99, 100], [98.99]),
+    ("Amber: 97.0%–98.99%", [97, 98.99], [96.99, 99]),
+    ("Red: < 97.0%", [96.9], [97]),
+    ("<= 10", [10], [10.5]),
+    (">= 1,000", [1000], [999]),
+    ("3 to 1", [1, 2, 3], [0, 4]),
+])
+def test_parse_rule(text, inside, outside):
+    rule = parse_rule(text)
+    assert [rule(x) for x in inside] == [True] * len(inside)
+    assert [rule(x) for x in outside] == [False] * len(outside)
+
+
+@pytest.mark.parametrize("text", [None, "", "Green: n/a", "Amber: between rules"])
+def test_parse_rule_not_understood(text):
+    assert parse_rule(text) is None
+
+
+SEEDED = compile_rules((
+    ("mttr_minutes", "Green: ≤ 45", "Amber: 46–90", "Red: > 90"),
+    ("p1_incidents", "Green: 0", "Amber: 1–2", "Red: ≥ 3"),
+    ("risk_count", "Green: ≤ 2", "Amber: 3–5", "Red: > 5"),
+    ("sla", "Green: ≥ 99.0%", "Amber: 97.0%–98.99%", "Red: < 97.0%"),
+))
+
+
+@pytest.mark.parametrize("values, rag", [
+    ((99.5, 0, 30, 1), "Green"),
+    ((98.0, 0, 30, 1), "Amber"),
+    ((98.995, 0, 30, 1), "Amber"),  # between the green and amber rules
+    ((99.5, 3, 30, 1), "Red"),
+    ((99.5, 1, 95, 1), "Red"),
+    ((None, None, None, None), None),
+    ((None, 0, None, 4), "Amber"),
+])
+def test_rate_matches_sql(values, rag):
+    assert SEEDED.rate(*values) == rag
+    c = sqlite3.connect(":memory:")
+    c.execute("CREATE TABLE kpis(sla REAL, p1_incidents INTEGER, mttr_minutes INTEGER, risk_count INTEGER)")
+    c.execute("INSERT INTO kpis VALUES (?,?,?,?)", values)
+    assert c.execute(f"SELECT {SEEDED.sql()} FROM kpis").fetchone()[0] == rag
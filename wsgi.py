@@ -0,0 +1,13 @@
+"""Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app      # Linux / macOS
+    python serve.py                            # any OS (waitress, or werkzeug's threaded server)
+
+Importing this module migrates/seeds the database once, so a preloading server
+does it in the master before forking workers. The pools are closed again
+afterwards: SQLite connections must not cross a fork, and each worker opens its own.
+"""
+import app as hub
+
+app = hub.create_app()
+hub.close_pool()